@@ -4,6 +4,7 @@ Handles port detection, server status checking, and test environment setup.
 """
 
 import os
+import importlib.util
 import pytest
 import warnings
 import json
@@ -83,7 +84,13 @@ def find_free_port(start_port=32000):
 def start_test_server(port):
     """Start the test server on the specified port."""
     project_root = Path(__file__).parent.absolute()
-    cmd = [sys.executable, str(project_root / "app.py"), "--port", str(port)]
+    if importlib.util.find_spec("waitress"):
+        # Multi-threaded server without the debug reloader, so concurrent
+        # requests (e.g. from pytest-xdist workers) are served in parallel
+        cmd = [sys.executable, "-m", "waitress", "--threads=4",
+               f"--listen=127.0.0.1:{port}", "app:app"]
+    else:
+        cmd = [sys.executable, str(project_root / "app.py"), "--port", str(port)]
     
     # Start server as a subprocess
     process = subprocess.Popen(
@@ -109,12 +116,42 @@ def start_test_server(port):
     raise RuntimeError(f"Failed to start test server on port {port}")
 
 
+def start_chromedriver(port):
+    """Start a standalone chromedriver on the specified port."""
+    binary = shutil.which('chromedriver')
+    if not binary:
+        return None
+
+    process = subprocess.Popen(
+        [binary, f"--port={port}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    # Wait for chromedriver to accept connections
+    start_time = time.time()
+    while time.time() - start_time < 10:  # 10 second timeout
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return process
+        time.sleep(0.1)
+
+    process.terminate()
+    return None
+
+
 def pytest_configure(config):
     """Configure pytest with server information."""
     config_dir = get_config_directory()
     
+    # pytest-xdist workers share the server started by the controller process
+    if hasattr(config, 'workerinput'):
+        port = get_server_port()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            server_running = sock.connect_ex(('127.0.0.1', port)) == 0
+        config.server_process = None
     # Check if server is already running
-    if is_server_running():
+    elif is_server_running():
         port = get_server_port()
         server_running = True
         config.server_process = None
@@ -214,6 +251,35 @@ def skip_if_server_not_running(server_running):
         pytest.skip("Server is not running - skipping integration test")
 
 
+@pytest.fixture(scope="session")
+def webdriver_url():
+    """
+    Fixture to provide a persistent WebDriver endpoint shared by the session.
+
+    Uses HELPFUL_TOOLS_WEBDRIVER_URL (e.g. a Selenium Grid) when set, otherwise
+    launches one chromedriver for the whole session. Yields None when neither
+    is available so browser tests can fall back to a local driver.
+    """
+    url = os.environ.get('HELPFUL_TOOLS_WEBDRIVER_URL')
+    if url:
+        yield url
+        return
+
+    port = find_free_port(9515)
+    process = start_chromedriver(port)
+    if process is None:
+        yield None
+        return
+
+    yield f'http://127.0.0.1:{port}'
+
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
 # Source management and cleanup utilities
 
 def get_sources_file_path():
@@ -5,19 +5,51 @@ Manages tool history with memory storage and configurable limits
 """
 
 import json
+import re
 import uuid
+from collections import deque
 from datetime import datetime
+from itertools import count
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Any
 
 class HistoryManager:
-    def __init__(self):
-        self.history_data: Dict[str, List[Dict]] = {}
-        self.global_history: List[Dict] = []  # Global history across all tools
+    def __init__(self, use_fast_ids: bool = False):
+        self.history_data: Dict[str, Deque[Dict]] = {}  # Most recent first
+        self.global_history: Deque[Dict] = deque()  # Global history across all tools
         self.data_storage: Dict[str, List[Dict]] = {}  # Manual data storage per tool
         self.tool_colors: Dict[str, str] = {}  # Color assignments for tool labels
+        # Entry id indexes so lookups, stars and deletes don't scan the lists
+        self._by_id: Dict[str, Dict[str, Dict]] = {}  # tool_name -> entry_id -> local entry
+        self._global_by_id: Dict[str, Dict] = {}  # entry_id -> global entry
+        # Starred-first orderings reused by get_history/get_global_history until the next write
+        self._ordered_cache: Dict[str, List[Dict]] = {}
+        self._global_ordered_cache: Optional[List[Dict]] = None
+        # Starred entry counts, kept in step with star changes so nothing has to scan for them
+        self._starred_count: Dict[str, int] = {}  # tool_name -> starred entries in its history
+        self._global_starred_count = 0
+        # Per-tool history limits that take precedence over config.json
+        self.limit_overrides: Dict[str, int] = {}
+        # Sequential ids are cheaper than uuid4 but only unique within this instance
+        self._id_counter = count(1) if use_fast_ids else None
         self.config = self._load_config()
     
+    def reset(self) -> None:
+        """Drop all history, data and limit overrides in place, keeping the loaded config"""
+        self.history_data.clear()
+        self.global_history.clear()
+        self.data_storage.clear()
+        self.tool_colors.clear()
+        self._by_id.clear()
+        self._global_by_id.clear()
+        self._ordered_cache.clear()
+        self._global_ordered_cache = None
+        self._starred_count.clear()
+        self._global_starred_count = 0
+        self.limit_overrides.clear()
+        if self._id_counter is not None:
+            self._id_counter = count(1)
+
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from config.json"""
         config_path = Path("config.json")
@@ -26,8 +58,17 @@ class HistoryManager:
                 return json.load(f)
         return {"history_limits": {}}
     
+    def _new_entry_id(self) -> str:
+        """Generate an id for a new history entry"""
+        if self._id_counter is not None:
+            return f"e{next(self._id_counter)}"
+        return str(uuid.uuid4())[:8]
+
     def _get_history_limit(self, tool_name: str) -> int:
         """Get history limit for a specific tool"""
+        limit = self.limit_overrides.get(tool_name)
+        if limit is not None:
+            return limit
         return self.config.get("history_limits", {}).get(tool_name, 20)
 
     def _get_data_limit(self, tool_name: str) -> int:
@@ -58,69 +99,113 @@ class HistoryManager:
     
     def add_history_entry(self, tool_name: str, data: str, operation: str = "process") -> Dict[str, Any]:
         """Add a new history entry for a tool"""
-        if tool_name not in self.history_data:
-            self.history_data[tool_name] = []
+        entry_id = self.add_history_entries(tool_name, [(data, operation)])[0]
         
-        entry = {
-            "id": str(uuid.uuid4())[:8],
-            "timestamp": datetime.now().isoformat(),
-            "data": data,
-            "operation": operation,
-            "preview": self._generate_preview(data),
-            "starred": False
+        return {
+            "success": True,
+            "entry_id": entry_id,
+            "message": "History entry added"
         }
-        
-        # Add to beginning of list (most recent first)
-        self.history_data[tool_name].insert(0, entry)
+
+    def add_history_entries(self, tool_name: str, entries: Iterable[Tuple]) -> List[str]:
+        """Add several history entries for a tool, given as (data, operation) or
+        (data, operation, starred) tuples oldest first; returns the new entry ids"""
+        entries = list(entries)
+        if not entries:
+            return []
+
+        if tool_name not in self.history_data:
+            self.history_data[tool_name] = deque()
+        history = self.history_data[tool_name]
+        tool_index = self._by_id.setdefault(tool_name, {})
+
+        # Assign the tool's label color now; it is looked up from tool_colors on read
+        # rather than copied into every entry
+        self._get_tool_color(tool_name)
+
+        entry_ids = []
+        for data, operation, *starred in entries:
+            entry = {
+                "id": self._new_entry_id(),
+                "timestamp": datetime.now().isoformat(),
+                "data": data,
+                "operation": operation,
+                "preview": self._generate_preview(data),
+                "starred": False,
+                "tool_name": tool_name
+            }
+
+            # Add to beginning of list (most recent first). The same entry object is
+            # shared with global history, so star changes are visible in both.
+            history.appendleft(entry)
+            tool_index[entry["id"]] = entry
+            self.global_history.appendleft(entry)
+            self._global_by_id[entry["id"]] = entry
+
+            # A new entry is already at the top of both lists, so starring only sets the flag
+            if starred and starred[0]:
+                self._set_starred(entry, True)
+            entry_ids.append(entry["id"])
 
         # Maintain history limit (excluding starred items)
-        limit = self._get_history_limit(tool_name)
-        if len(self.history_data[tool_name]) > limit:
-            # Separate starred and non-starred items
-            starred_items = [e for e in self.history_data[tool_name] if e.get("starred", False)]
-            non_starred_items = [e for e in self.history_data[tool_name] if not e.get("starred", False)]
-
-            # Keep all starred items + limit number of non-starred items
-            self.history_data[tool_name] = starred_items + non_starred_items[:limit]
-        
-        # Also add to global history
-        global_entry = {
-            **entry,
-            "tool_name": tool_name,
-            "tool_color": self._get_tool_color(tool_name)
-        }
-        
-        self.global_history.insert(0, global_entry)
+        self._trim_unstarred(history, self._get_history_limit(tool_name),
+                             tool_index, self._starred_count.get(tool_name, 0))
 
         # Maintain global history limit (excluding starred items, configurable, default 100)
-        global_limit = self.config.get("global_history_limit", 100)
-        if len(self.global_history) > global_limit:
-            # Separate starred and non-starred items
-            starred_global = [e for e in self.global_history if e.get("starred", False)]
-            non_starred_global = [e for e in self.global_history if not e.get("starred", False)]
-
-            # Keep all starred items + global_limit number of non-starred items
-            self.global_history = starred_global + non_starred_global[:global_limit]
-        
-        return {
-            "success": True,
-            "entry_id": entry["id"],
-            "message": "History entry added"
-        }
+        self._trim_unstarred(self.global_history, self.config.get("global_history_limit", 100),
+                             self._global_by_id, self._global_starred_count)
+        self._invalidate_order(tool_name)
+
+        return entry_ids
     
+    def _invalidate_order(self, tool_name: str) -> None:
+        """Drop the cached orderings for a tool and for global history"""
+        self._ordered_cache.pop(tool_name, None)
+        self._global_ordered_cache = None
+
+    @staticmethod
+    def _starred_first(entries) -> List[Dict]:
+        """Order entries with starred items first, keeping relative order within each group"""
+        # Sort: starred items first (most recently starred on top), then regular items,
+        # splitting them in a single pass over the entries
+        starred_items, regular_items = [], []
+        for entry in entries:
+            (starred_items if entry.get("starred", False) else regular_items).append(entry)
+
+        # Combine: starred items first, then regular items
+        starred_items.extend(regular_items)
+        return starred_items
+
+    @staticmethod
+    def _trim_unstarred(entries: Deque[Dict], limit: int, index: Dict[str, Dict], starred_count: int) -> None:
+        """Evict the oldest non-starred entries until at most `limit` remain; starred entries are kept"""
+        excess = len(entries) - limit - starred_count
+
+        # Oldest entries sit at the right end, so the common case is an O(1) pop
+        while excess > 0 and not entries[-1].get("starred", False):
+            index.pop(entries.pop()["id"], None)
+            excess -= 1
+
+        if excess > 0:
+            # A starred entry is at the tail; evict the oldest non-starred ones behind it
+            victims = []
+            for e in reversed(entries):
+                if not e.get("starred", False):
+                    victims.append(e)
+                    if len(victims) == excess:
+                        break
+            for e in victims:
+                entries.remove(e)
+                index.pop(e["id"], None)
+
     def get_history(self, tool_name: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get history entries for a tool"""
         if tool_name not in self.history_data:
             return []
 
-        history = self.history_data[tool_name]
-
-        # Sort: starred items first (most recently starred on top), then regular items
-        starred_items = [entry for entry in history if entry.get("starred", False)]
-        regular_items = [entry for entry in history if not entry.get("starred", False)]
-
-        # Combine: starred items first, then regular items
-        sorted_history = starred_items + regular_items
+        sorted_history = self._ordered_cache.get(tool_name)
+        if sorted_history is None:
+            sorted_history = self._ordered_cache[tool_name] = self._starred_first(self.history_data[tool_name])
 
         if limit:
             sorted_history = sorted_history[:limit]
@@ -140,25 +225,35 @@ class HistoryManager:
     
     def get_history_entry(self, tool_name: str, entry_id: str) -> Optional[Dict[str, Any]]:
         """Get specific history entry data"""
-        if tool_name not in self.history_data:
+        entry = self._by_id.get(tool_name, {}).get(entry_id)
+        if entry is None:
             return None
-        
-        for entry in self.history_data[tool_name]:
-            if entry["id"] == entry_id:
-                return {
-                    "id": entry["id"],
-                    "timestamp": entry["timestamp"],
-                    "data": entry["data"],
-                    "operation": entry.get("operation", "process"),
-                    "preview": entry["preview"]
-                }
-        
-        return None
+
+        return self._entry_details(entry)
+
+    @staticmethod
+    def _entry_details(entry: Dict) -> Dict[str, Any]:
+        """Format a stored entry the way get_history_entry returns it"""
+        return {
+            "id": entry["id"],
+            "timestamp": entry["timestamp"],
+            "data": entry["data"],
+            "operation": entry.get("operation", "process"),
+            "preview": entry["preview"],
+            "starred": entry.get("starred", False)
+        }
+
+    def count_history(self, tool_name: str) -> int:
+        """Get the number of history entries for a tool without copying them"""
+        return len(self.history_data.get(tool_name, ()))
     
     def clear_history(self, tool_name: str) -> Dict[str, Any]:
         """Clear all history for a tool"""
         if tool_name in self.history_data:
             del self.history_data[tool_name]
+        self._by_id.pop(tool_name, None)
+        self._ordered_cache.pop(tool_name, None)
+        self._starred_count.pop(tool_name, None)
         
         return {
             "success": True,
@@ -216,14 +311,9 @@ class HistoryManager:
     
     def get_global_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get global history entries across all tools"""
-        history = self.global_history
-
-        # Sort: starred items first (most recently starred on top), then regular items
-        starred_items = [entry for entry in history if entry.get("starred", False)]
-        regular_items = [entry for entry in history if not entry.get("starred", False)]
-
-        # Combine: starred items first, then regular items
-        sorted_history = starred_items + regular_items
+        sorted_history = self._global_ordered_cache
+        if sorted_history is None:
+            sorted_history = self._global_ordered_cache = self._starred_first(self.global_history)
 
         if limit:
             sorted_history = sorted_history[:limit]
@@ -236,7 +326,7 @@ class HistoryManager:
                 "preview": entry["preview"],
                 "operation": entry.get("operation", "process"),
                 "tool_name": entry["tool_name"],
-                "tool_color": entry["tool_color"],
+                "tool_color": self._get_tool_color(entry["tool_name"]),
                 "formatted_date": self._format_date(entry["timestamp"]),
                 "starred": entry.get("starred", False)
             }
@@ -245,19 +335,32 @@ class HistoryManager:
     
     def get_global_history_entry(self, entry_id: str) -> Optional[Dict[str, Any]]:
         """Get specific global history entry data"""
-        for entry in self.global_history:
-            if entry["id"] == entry_id:
-                return {
-                    "id": entry["id"],
-                    "timestamp": entry["timestamp"],
-                    "data": entry["data"],
-                    "operation": entry.get("operation", "process"),
-                    "tool_name": entry["tool_name"],
-                    "tool_color": entry["tool_color"],
-                    "preview": entry["preview"]
-                }
-        
-        return None
+        entry = self._global_by_id.get(entry_id)
+        if entry is None:
+            return None
+
+        return {
+            "id": entry["id"],
+            "timestamp": entry["timestamp"],
+            "data": entry["data"],
+            "operation": entry.get("operation", "process"),
+            "tool_name": entry["tool_name"],
+            "tool_color": self._get_tool_color(entry["tool_name"]),
+            "preview": entry["preview"],
+            "starred": entry.get("starred", False)
+        }
+
+    def count_global_history(self) -> int:
+        """Get the number of global history entries without copying them"""
+        return len(self.global_history)
+
+    def starred_count(self, tool_name: str) -> int:
+        """Get the number of starred history entries for a tool"""
+        return self._starred_count.get(tool_name, 0)
+
+    def global_starred_count(self) -> int:
+        """Get the number of starred global history entries"""
+        return self._global_starred_count
     
     def delete_history_entry(self, tool_name: str, entry_id: str) -> bool:
         """Delete specific history entry for a tool and from global history"""
@@ -265,131 +368,136 @@ class HistoryManager:
             return False
 
         # Check if the entry is starred
-        for entry in self.history_data[tool_name]:
-            if entry["id"] == entry_id and entry.get("starred", False):
-                return False  # Cannot delete starred items
+        local_entry = self._by_id.get(tool_name, {}).get(entry_id)
+        if local_entry is not None and local_entry.get("starred", False):
+            return False  # Cannot delete starred items
 
         # Delete from local history
-        original_local_count = len(self.history_data[tool_name])
-        self.history_data[tool_name] = [
-            entry for entry in self.history_data[tool_name]
-            if entry["id"] != entry_id
-        ]
+        if local_entry is not None:
+            self.history_data[tool_name].remove(local_entry)
+            del self._by_id[tool_name][entry_id]
 
         # Delete from global history (same ID)
-        original_global_count = len(self.global_history)
-        self.global_history = [
-            entry for entry in self.global_history
-            if entry["id"] != entry_id
-        ]
+        global_entry = self._global_by_id.pop(entry_id, None)
+        if global_entry is not None:
+            self.global_history.remove(global_entry)
+            if global_entry.get("starred", False):
+                self._global_starred_count -= 1
+        self._invalidate_order(tool_name)
 
         # Return True if an entry was actually deleted from either location
-        return (len(self.history_data[tool_name]) < original_local_count or
-                len(self.global_history) < original_global_count)
+        return local_entry is not None or global_entry is not None
     
     def delete_global_history_entry(self, entry_id: str) -> bool:
         """Delete specific global history entry and from all local histories"""
         # Check if the entry is starred in global history
-        for entry in self.global_history:
-            if entry["id"] == entry_id and entry.get("starred", False):
-                return False  # Cannot delete starred items
+        global_entry = self._global_by_id.get(entry_id)
+        if global_entry is not None and global_entry.get("starred", False):
+            return False  # Cannot delete starred items
 
         # Delete from global history
-        original_global_count = len(self.global_history)
-        self.global_history = [
-            entry for entry in self.global_history
-            if entry["id"] != entry_id
-        ]
+        if global_entry is not None:
+            self.global_history.remove(global_entry)
+            del self._global_by_id[entry_id]
 
         # Delete from all local histories (same ID might exist in any tool)
         deleted_from_local = False
-        for tool_name in self.history_data:
-            original_local_count = len(self.history_data[tool_name])
-            self.history_data[tool_name] = [
-                entry for entry in self.history_data[tool_name]
-                if entry["id"] != entry_id
-            ]
-            if len(self.history_data[tool_name]) < original_local_count:
+        for tool_name, tool_index in self._by_id.items():
+            local_entry = tool_index.pop(entry_id, None)
+            if local_entry is not None:
+                self.history_data[tool_name].remove(local_entry)
+                self._ordered_cache.pop(tool_name, None)
+                if local_entry.get("starred", False):
+                    self._starred_count[tool_name] -= 1
                 deleted_from_local = True
+        self._global_ordered_cache = None
 
         # Return True if an entry was actually deleted from either location
-        return (len(self.global_history) < original_global_count or deleted_from_local)
+        return global_entry is not None or deleted_from_local
 
     def clear_global_history(self) -> Dict[str, Any]:
         """Clear all global history"""
-        self.global_history = []
+        self.global_history.clear()
+        self._global_by_id.clear()
+        self._global_ordered_cache = None
+        self._global_starred_count = 0
 
         return {
             "success": True,
             "message": "Global history cleared"
         }
 
+    def _set_starred(self, entry: Dict, starred: bool) -> None:
+        """Set an entry's star flag and keep the starred counters in step"""
+        if entry.get("starred", False) != starred:
+            delta = 1 if starred else -1
+            tool_name = entry["tool_name"]
+            if entry["id"] in self._by_id.get(tool_name, {}):
+                self._starred_count[tool_name] = self._starred_count.get(tool_name, 0) + delta
+            if entry["id"] in self._global_by_id:
+                self._global_starred_count += delta
+        entry["starred"] = starred
+
+    @staticmethod
+    def _move_to_top(entries: Deque[Dict], entry: Dict) -> None:
+        """Move an entry to the beginning of its list"""
+        entries.remove(entry)
+        entries.appendleft(entry)
+
     def update_star_status(self, tool_name: str, entry_id: str, starred: bool) -> bool:
         """Update star status for a local history entry and sync with global"""
+        return self.update_star_status_bulk(tool_name, (entry_id,), starred) == 1
+
+    def update_star_status_bulk(self, tool_name: str, entry_ids: Iterable[str], starred: bool) -> int:
+        """Update star status for several local history entries; returns how many were found"""
         if tool_name not in self.history_data:
+            return 0
+
+        tool_index = self._by_id.get(tool_name, {})
+        local_history = self.history_data[tool_name]
+        touched_tools = set()
+        hits = 0
+        for entry_id in entry_ids:
+            local_entry = tool_index.get(entry_id)
+            global_entry = self._global_by_id.get(entry_id)
+            entry = local_entry if local_entry is not None else global_entry
+            if entry is None:
+                continue
+
+            # Local and global share the entry object, so one write updates both
+            self._set_starred(entry, starred)
+            touched_tools.add(entry["tool_name"])
+            hits += 1
+
+            # Move to top of each list it appears in if starred
+            if starred:
+                if local_entry is not None:
+                    self._move_to_top(local_history, entry)
+                if global_entry is not None:
+                    self._move_to_top(self.global_history, entry)
+
+        for touched in touched_tools:
+            self._invalidate_order(touched)
+        return hits
+
+    def update_global_star_status(self, entry_id: str, starred: bool) -> bool:
+        """Update star status for a global history entry and sync with local histories"""
+        entry = self._global_by_id.get(entry_id)
+        if entry is None:
             return False
 
-        # Update in local history and move to top if starred
-        local_updated = False
-        starred_entry = None
-        for i, entry in enumerate(self.history_data[tool_name]):
-            if entry["id"] == entry_id:
-                entry["starred"] = starred
-                local_updated = True
-                if starred:
-                    # Remove from current position
-                    starred_entry = self.history_data[tool_name].pop(i)
-                    # Insert at the beginning
-                    self.history_data[tool_name].insert(0, starred_entry)
-                break
-
-        # Update in global history and move to top if starred
-        global_updated = False
-        for i, entry in enumerate(self.global_history):
-            if entry["id"] == entry_id:
-                entry["starred"] = starred
-                global_updated = True
-                if starred:
-                    # Remove from current position
-                    starred_entry = self.global_history.pop(i)
-                    # Insert at the beginning
-                    self.global_history.insert(0, starred_entry)
-                break
+        # Local and global share the entry object, so one write updates both
+        self._set_starred(entry, starred)
+        self._invalidate_order(entry["tool_name"])
 
-        return local_updated or global_updated
+        # Move to top of global and local history if starred
+        if starred:
+            self._move_to_top(self.global_history, entry)
+            tool_name = entry["tool_name"]
+            if entry_id in self._by_id.get(tool_name, {}):
+                self._move_to_top(self.history_data[tool_name], entry)
 
-    def update_global_star_status(self, entry_id: str, starred: bool) -> bool:
-        """Update star status for a global history entry and sync with local histories"""
-        # Update in global history and move to top if starred
-        global_updated = False
-        tool_name = None
-        for i, entry in enumerate(self.global_history):
-            if entry["id"] == entry_id:
-                entry["starred"] = starred
-                tool_name = entry["tool_name"]
-                global_updated = True
-                if starred:
-                    # Remove from current position
-                    starred_entry = self.global_history.pop(i)
-                    # Insert at the beginning
-                    self.global_history.insert(0, starred_entry)
-                break
-
-        # Update in local history if tool exists and move to top if starred
-        local_updated = False
-        if tool_name and tool_name in self.history_data:
-            for i, entry in enumerate(self.history_data[tool_name]):
-                if entry["id"] == entry_id:
-                    entry["starred"] = starred
-                    local_updated = True
-                    if starred:
-                        # Remove from current position
-                        starred_entry = self.history_data[tool_name].pop(i)
-                        # Insert at the beginning
-                        self.history_data[tool_name].insert(0, starred_entry)
-                    break
-
-        return global_updated or local_updated
+        return True
 
     # ========== Data Storage Methods ==========
 
@@ -486,18 +594,20 @@ class HistoryManager:
 # Global instance
 history_manager = HistoryManager()
 
+# Allow alphanumeric, hyphens, and underscores
+_TOOL_NAME_RE = re.compile(r'^[A-Za-z0-9_-]+\Z')
+
 def validate_tool_name(tool_name: str) -> bool:
     """Validate tool name format"""
-    if not tool_name:
-        return False
-    
-    # Allow alphanumeric, hyphens, and underscores
-    allowed_chars = set('abcdefghijklmnopqrstuvwxyz0123456789-_')
-    return all(c.lower() in allowed_chars for c in tool_name)
+    return isinstance(tool_name, str) and _TOOL_NAME_RE.match(tool_name) is not None
 
 def sanitize_data(data: str, max_size: int = 1024 * 1024) -> str:
     """Sanitize and validate input data"""
     if not isinstance(data, str):
+        # The repr of bytes is never shorter than the bytes themselves, so reject
+        # oversized binary payloads before materializing it
+        if isinstance(data, (bytes, bytearray)) and len(data) > max_size:
+            raise ValueError(f"Data too large. Maximum size: {max_size} characters")
         data = str(data)
     
     # Limit data size (1MB default)
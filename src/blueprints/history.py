@@ -25,6 +25,41 @@ def add_history(tool_name):
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+@history_bp.route('/api/history/<tool_name>/bulk', methods=['POST'])
+def add_history_bulk(tool_name):
+    """Add several history entries (optionally starred) in one request"""
+    if not validate_tool_name(tool_name):
+        return jsonify({'error': 'Invalid tool name'}), 400
+
+    try:
+        data = request.json
+        entries = data.get('entries') if isinstance(data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'error': 'Missing entries field'}), 400
+        if not all(isinstance(entry, dict) and 'data' in entry for entry in entries):
+            return jsonify({'error': 'Missing data field'}), 400
+        if not all(isinstance(entry.get('starred', False), bool) for entry in entries):
+            return jsonify({'error': 'Invalid starred field, expected true or false'}), 400
+
+        # Validate everything up front so a bad entry doesn't leave a partial batch
+        prepared = [
+            (sanitize_data(entry['data']), entry.get('operation', 'process'), entry.get('starred', False))
+            for entry in entries
+        ]
+
+        entry_ids = history_manager.add_history_entries(tool_name, prepared)
+
+        return jsonify({
+            'success': True,
+            'entry_ids': entry_ids,
+            'message': f'{len(entry_ids)} history entries added'
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 @history_bp.route('/api/history/<tool_name>', methods=['GET'])
 def get_history(tool_name):
     if not validate_tool_name(tool_name):
@@ -58,17 +93,8 @@ def delete_history_entry(tool_name, entry_id):
     try:
         # Check if entry is starred before attempting delete
         entry = history_manager.get_history_entry(tool_name, entry_id)
-        if entry:
-            # Get the full entry to check starred status
-            full_entry = None
-            if tool_name in history_manager.history_data:
-                for e in history_manager.history_data[tool_name]:
-                    if e["id"] == entry_id:
-                        full_entry = e
-                        break
-
-            if full_entry and full_entry.get("starred", False):
-                return jsonify({'error': 'Cannot delete starred items. Remove the star first.'}), 403
+        if entry and entry["starred"]:
+            return jsonify({'error': 'Cannot delete starred items. Remove the star first.'}), 403
 
         success = history_manager.delete_history_entry(tool_name, entry_id)
         if success:
@@ -148,16 +174,8 @@ def delete_global_history_entry(entry_id):
     try:
         # Check if entry is starred before attempting delete
         entry = history_manager.get_global_history_entry(entry_id)
-        if entry:
-            # Get the full entry to check starred status
-            full_entry = None
-            for e in history_manager.global_history:
-                if e["id"] == entry_id:
-                    full_entry = e
-                    break
-
-            if full_entry and full_entry.get("starred", False):
-                return jsonify({'error': 'Cannot delete starred items. Remove the star first.'}), 403
+        if entry and entry["starred"]:
+            return jsonify({'error': 'Cannot delete starred items. Remove the star first.'}), 403
 
         success = history_manager.delete_global_history_entry(entry_id)
         if success:
@@ -340,21 +340,15 @@ class LocalFileSource(BaseDataSource):
             raise SourcePermissionError(f"No read permission for directory: {target_path}")
 
         try:
-            # Use os.scandir for efficient directory scanning
+            # Use os.scandir for efficient directory scanning; the listing is
+            # cached unfiltered, so filter_type is applied afterwards
             all_items = []
             with os.scandir(target_path) as entries:
                 for entry in entries:
                     try:
                         # Get stat info efficiently
                         stat_result = entry.stat()
-
-                        # Apply filter early if specified
                         is_directory = entry.is_dir()
-                        if pagination.filter_type:
-                            if pagination.filter_type == 'files' and is_directory:
-                                continue
-                            elif pagination.filter_type == 'directories' and not is_directory:
-                                continue
 
                         # Use base class method for consistent timestamp formatting
                         time_data = self.format_last_modified(stat_result.st_mtime)
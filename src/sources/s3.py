@@ -474,6 +474,8 @@ class S3Source(BaseDataSource):
                 }
             )
 
+            # Collect every entry unfiltered; the listing is cached as the
+            # full directory, so filter_type is applied afterwards
             all_items = []
 
             for page in page_iterator:
@@ -486,10 +488,6 @@ class S3Source(BaseDataSource):
                     if not directory_name:
                         continue
 
-                    # Apply filter early
-                    if pagination.filter_type == 'files':
-                        continue
-
                     all_items.append({
                         'name': directory_name,
                         'path': f"s3://{self._bucket}/{prefix_info['Prefix']}",
@@ -515,10 +513,6 @@ class S3Source(BaseDataSource):
                     if not file_name:
                         continue
 
-                    # Apply filter early
-                    if pagination.filter_type == 'directories':
-                        continue
-
                     # Use base class method for consistent timestamp formatting
                     time_data = self.format_last_modified(obj['LastModified'])
 
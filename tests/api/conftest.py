@@ -0,0 +1,48 @@
+"""
+Fixtures shared by the source and pagination API endpoint tests.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from main import app
+
+
+@pytest.fixture
+def stored_sources(monkeypatch):
+    """Make get_stored_sources() return the given mapping for the rest of the test."""
+    def install(sources):
+        monkeypatch.setattr('utils.source_helpers.get_stored_sources', lambda: sources)
+    return install
+
+
+@pytest.fixture
+def s3_mock_client(monkeypatch):
+    """Route S3Source to a mock client whose list_objects_v2 paginator yields one page."""
+    def make(contents=(), prefixes=()):
+        mock_client = MagicMock()
+        mock_client.get_paginator.return_value.paginate.return_value = [{
+            'Contents': list(contents),
+            'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes]
+        }]
+        monkeypatch.setattr('sources.s3.S3Source._get_s3_client', lambda self: mock_client)
+        return mock_client
+    return make
+
+
+@pytest.fixture(scope="module")
+def isolated_home(tmp_path_factory):
+    """Point HOME at a private directory so each module (and xdist worker) gets its own source cache."""
+    # UnifiedSourceCache keeps listings under ~/.helpful-tools/sources/<source_id>/,
+    # keyed only by source_id, so a shared HOME lets workers overwrite each other's cache
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('HOME', str(tmp_path_factory.mktemp('home')))
+        yield
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Create one test client for the module; no test changes app config."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
@@ -8,51 +8,66 @@ import sys
 import os
 import pytest
 import json
-import tempfile
-from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
 from api.history import HistoryManager, validate_tool_name, sanitize_data
 
+# Serialized config.json payloads, built once at import
+_CFG_50 = json.dumps({
+    "history_limits": {"test-tool": 50},
+    "global_history_limit": 150
+})
+_CFG_LIMIT2 = json.dumps({"global_history_limit": 2})
+_CFG_TOOL_LIMITS = json.dumps({
+    "history_limits": {
+        "json-tool": 30,
+        "yaml-tool": 40
+    },
+    "global_history_limit": 200
+})
+
+# sanitize_data inputs, allocated once per session
+_LARGE_DATA = "x" * (1024 * 1024 + 1)  # Exceed 1MB limit
+_SANITIZE_LIST = [1, 2, 3]
+_SANITIZE_DICT = {"key": "value", "nested": {"inner": "data"}}
+
 
 class TestHistoryCoverage:
     """Test suite to improve history.py coverage"""
 
-    def setup_method(self):
-        """Setup fresh HistoryManager for each test"""
-        self.history_manager = HistoryManager()
+    @pytest.fixture(scope="class")
+    def manager(self):
+        """Single HistoryManager shared by the class (config is loaded once)"""
+        return HistoryManager()
+
+    @pytest.fixture(autouse=True)
+    def _reset(self, manager):
+        """Reset the shared HistoryManager state before each test"""
+        manager.reset()
+        self.history_manager = manager
 
-    def test_load_config_with_existing_file(self):
+    def test_load_config_with_existing_file(self, fs):
         """Test _load_config when config.json exists - covers lines 24-25"""
-        config_data = {
-            "history_limits": {"test-tool": 50},
-            "global_history_limit": 150
-        }
-
-        # Mock file existence and content
-        with patch('pathlib.Path.exists', return_value=True):
-            with patch('builtins.open', mock_open(read_data=json.dumps(config_data))):
-                # Create new manager to trigger config loading
-                manager = HistoryManager()
-                assert manager.config["history_limits"]["test-tool"] == 50
-                assert manager.config["global_history_limit"] == 150
-
-    def test_load_config_without_file(self):
+        # In-memory config.json in the fake working directory
+        fs.create_file("config.json", contents=_CFG_50)
+
+        # Create new manager to trigger config loading
+        manager = HistoryManager()
+        assert manager.config["history_limits"]["test-tool"] == 50
+        assert manager.config["global_history_limit"] == 150
+
+    def test_load_config_without_file(self, fs):
         """Test _load_config when config.json doesn't exist - covers line 26"""
-        with patch('pathlib.Path.exists', return_value=False):
-            manager = HistoryManager()
-            assert manager.config == {"history_limits": {}}
+        manager = HistoryManager()
+        assert manager.config == {"history_limits": {}}
 
-    def test_global_history_limit_enforcement(self):
+    def test_global_history_limit_enforcement(self, fs):
         """Test global history limit enforcement - covers line 88"""
         # Set up a history manager with a low global limit
-        with patch('pathlib.Path.exists', return_value=True):
-            config_data = {"global_history_limit": 2}
-            with patch('builtins.open', mock_open(read_data=json.dumps(config_data))):
-                manager = HistoryManager()
+        fs.create_file("config.json", contents=_CFG_LIMIT2)
+        manager = HistoryManager()
 
         # Add multiple entries to exceed the limit
         manager.add_history_entry("tool1", "data1", "op1")
@@ -77,6 +92,33 @@ class TestHistoryCoverage:
 
         assert len(limited_history) == 2
 
+    def test_fast_entry_ids(self):
+        """Test use_fast_ids hands out sequential ids instead of uuid4 prefixes"""
+        manager = HistoryManager(use_fast_ids=True)
+        first = manager.add_history_entry("tool1", "data1", "op1")["entry_id"]
+        second = manager.add_history_entry("tool1", "data2", "op2")["entry_id"]
+        assert (first, second) == ("e1", "e2")
+        assert manager.get_history_entry("tool1", second)["data"] == "data2"
+
+        # Default ids stay 8-character uuid4 prefixes
+        assert len(self.history_manager.add_history_entry("tool1", "data1")["entry_id"]) == 8
+
+    def test_reset_clears_state_in_place(self):
+        """Test reset drops history, data and lookups while keeping the same containers"""
+        manager = HistoryManager(use_fast_ids=True)
+        history_data = manager.history_data
+        entry_id = manager.add_history_entry("tool1", "data1", "op1")["entry_id"]
+        manager.add_data_entry("tool1", "data1", "desc")
+
+        manager.reset()
+
+        assert manager.history_data is history_data
+        assert manager.count_history("tool1") == 0
+        assert manager.count_global_history() == 0
+        assert manager.get_data("tool1") == []
+        assert manager.get_global_history_entry(entry_id) is None
+        assert manager.add_history_entry("tool1", "data2")["entry_id"] == "e1"
+
     def test_get_history_entry_nonexistent_tool(self):
         """Test get_history_entry with nonexistent tool - covers line 122"""
         result = self.history_manager.get_history_entry("nonexistent-tool", "some-id")
@@ -116,6 +158,11 @@ class TestHistoryCoverage:
         result = self.history_manager.delete_history_entry(tool_name, "nonexistent-id")
         assert result is False
 
+    def test_count_history_nonexistent_tool(self):
+        """Test count_history/count_global_history on an empty manager"""
+        assert self.history_manager.count_history("nonexistent-tool") == 0
+        assert self.history_manager.count_global_history() == 0
+
     def test_clear_history_any_tool(self):
         """Test clear_history - always succeeds"""
         result = self.history_manager.clear_history("any-tool")
@@ -133,15 +180,13 @@ class TestHistoryCoverage:
 
     def test_get_global_history_empty(self):
         """Test get_global_history when no history exists - covers line 231"""
-        # Fresh manager with no history
-        manager = HistoryManager()
-        result = manager.get_global_history()
+        # Freshly reset manager with no history
+        result = self.history_manager.get_global_history()
         assert result == []
 
     def test_get_all_history_stats_empty(self):
         """Test get_all_history_stats with no history"""
-        manager = HistoryManager()
-        result = manager.get_all_history_stats()
+        result = self.history_manager.get_all_history_stats()
         assert isinstance(result, dict)
         assert "total_entries" in result
 
@@ -169,59 +214,46 @@ class TestHistoryCoverage:
     def test_sanitize_data_edge_cases(self):
         """Test sanitize_data with various data types and sizes"""
         # Test large data raises exception
-        large_data = "x" * (1024 * 1024 + 1)  # Exceed 1MB limit
         with pytest.raises(ValueError, match="Data too large"):
-            sanitize_data(large_data)
+            sanitize_data(_LARGE_DATA)
 
         # Test non-string data conversion
         assert sanitize_data(123) == "123"
         assert sanitize_data(None) == "None"
-        assert sanitize_data([1, 2, 3]) == "[1, 2, 3]"
+        assert sanitize_data(_SANITIZE_LIST) == "[1, 2, 3]"
 
         # Test normal string
         normal_data = "test data"
         assert sanitize_data(normal_data) == "test data"
 
         # Test dictionary conversion
-        test_dict = {"key": "value", "nested": {"inner": "data"}}
-        sanitized = sanitize_data(test_dict)
+        sanitized = sanitize_data(_SANITIZE_DICT)
         assert "key" in sanitized
         assert "value" in sanitized
 
-    def test_history_manager_initialization_with_config(self):
+    def test_history_manager_initialization_with_config(self, fs):
         """Test HistoryManager initialization with custom config"""
-        config_data = {
-            "history_limits": {
-                "json-tool": 30,
-                "yaml-tool": 40
-            },
-            "global_history_limit": 200
-        }
-
-        with patch('pathlib.Path.exists', return_value=True):
-            with patch('builtins.open', mock_open(read_data=json.dumps(config_data))):
-                manager = HistoryManager()
-
-                # Test that config is loaded properly
-                assert manager._get_history_limit("json-tool") == 30
-                assert manager._get_history_limit("yaml-tool") == 40
-                assert manager._get_history_limit("unknown-tool") == 20  # default
+        fs.create_file("config.json", contents=_CFG_TOOL_LIMITS)
+        manager = HistoryManager()
+
+        # Test that config is loaded properly
+        assert manager._get_history_limit("json-tool") == 30
+        assert manager._get_history_limit("yaml-tool") == 40
+        assert manager._get_history_limit("unknown-tool") == 20  # default
+
+        # Runtime overrides win over config.json
+        manager.limit_overrides["json-tool"] = 5
+        assert manager._get_history_limit("json-tool") == 5
 
     def test_tool_color_assignment(self):
         """Test tool color assignment and cycling"""
         manager = self.history_manager
 
-        # Test color assignment for new tools
-        tools = [f"tool{i}" for i in range(15)]  # More than available colors
-        colors = []
-
-        for tool in tools:
-            color = manager._get_tool_color(tool)
-            colors.append(color)
+        # First 10 tools should each get a unique color
+        assert len({manager._get_tool_color(f"tool{i}") for i in range(10)}) == 10
 
-        # Should assign colors and cycle through them
-        assert len(set(colors[:10])) == 10  # First 10 should be unique
-        assert colors[10] == colors[0]  # Should cycle back to first color
+        # More tools than available colors should cycle back to the first color
+        assert manager._get_tool_color("tool10") == manager._get_tool_color("tool0")
 
     def test_format_date_method(self):
         """Test _format_date method with different timestamps"""
@@ -4,41 +4,141 @@ Integration tests for history star API endpoints
 Tests the Flask routes for star functionality
 """
 
-import sys
 import os
 import pytest
 import json
 import requests
-import time
-from unittest.mock import patch
+from itertools import islice
+from requests.adapters import HTTPAdapter
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Test configuration
-BASE_URL = "http://127.0.0.1:8000"
+BASE_URL = os.environ.get('HELPFUL_TOOLS_BASE_URL', "http://127.0.0.1:8000")
 TEST_TOOL = "test-integration-tool"
 
+# Pre-serialized star request bodies, sent with data= on the JSON session
+_STAR_TRUE = b'{"starred": true}'
+_STAR_FALSE = b'{"starred": false}'
+
+
+def _json_bytes(obj):
+    """Serialize a request body once, preferring orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _json_of(response):
+    """Decode a response body, preferring orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+class FastSession(requests.Session):
+    """Session that serializes json= request bodies with orjson"""
+
+    def request(self, method, url, json=None, **kwargs):
+        if json is not None:
+            kwargs["data"] = _json_bytes(json)
+        return super().request(method, url, **kwargs)
 
+
+@pytest.fixture(scope="session")
+def _server_up():
+    """Probe the server once per session; skip dependent tests if it is down"""
+    try:
+        response = requests.get(f"{BASE_URL}/", timeout=2)
+    except requests.exceptions.RequestException:
+        pytest.skip(f"Server not running at {BASE_URL}")
+    if response.status_code != 200:
+        pytest.skip(f"Server not running at {BASE_URL}")
+    return True
+
+
+@pytest.mark.usefixtures("_server_up")
 class TestHistoryStarAPIEndpoints:
     """Integration tests for history star API endpoints"""
 
     @classmethod
     def setup_class(cls):
-        """Setup class - ensure server is running"""
+        """Setup class - open a pooled session"""
+        cls.http = FastSession()
+        cls.http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        cls.http.headers.update({"Content-Type": "application/json"})
+
+    @classmethod
+    def teardown_class(cls):
+        """Teardown class - close the pooled session"""
+        cls.http.close()
+
+    @pytest.fixture(autouse=True)
+    def worker_tool(self):
+        """Per-worker tool name so pytest-xdist workers never share history"""
+        self.worker_tool = f"{TEST_TOOL}-{os.environ.get('PYTEST_XDIST_WORKER', 'master')}"
+
+        # Clear any existing history for this worker's tool only; global
+        # history is shared by all workers, so tests match it by entry id
         try:
-            response = requests.get(f"{BASE_URL}/", timeout=5)
-            if response.status_code != 200:
-                pytest.skip("Server not running at http://127.0.0.1:8000")
+            self.http.delete(f"{BASE_URL}/api/history/{self.worker_tool}")
         except requests.exceptions.RequestException:
-            pytest.skip("Server not running at http://127.0.0.1:8000")
+            pass
+
+        yield self.worker_tool
 
-    def setup_method(self):
-        """Setup for each test"""
-        # Clear any existing history for our test tool
         try:
-            requests.delete(f"{BASE_URL}/api/history/{TEST_TOOL}")
-            requests.delete(f"{BASE_URL}/api/global-history")
-        except:
+            # Clearing the tool leaves its entries in global history, and starred
+            # ones cannot be deleted, so unstar and delete this worker's entries there first
+            response = self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}")
+            for entry in _json_of(response).get("history", []):
+                self.http.put(f"{BASE_URL}/api/global-history/{entry['id']}/star", data=_STAR_FALSE)
+                self.http.delete(f"{BASE_URL}/api/global-history/{entry['id']}")
+            self.http.delete(f"{BASE_URL}/api/history/{self.worker_tool}")
+        except requests.exceptions.RequestException:
             pass
 
+    @pytest.fixture
+    def add_entry(self, worker_tool):
+        """Factory that adds a history entry for this worker's tool and returns its id"""
+        def _add(data="default", operation="default"):
+            response = self.http.post(
+                f"{BASE_URL}/api/history/{worker_tool}",
+                json={"data": data, "operation": operation}
+            )
+            response.raise_for_status()
+            entry_id = _json_of(response).get("entry_id")
+            assert entry_id
+            return entry_id
+        return _add
+
+    def _local_entry(self, entry_id):
+        """Local history entry with the given id, or None"""
+        history = _json_of(self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}"))["history"]
+        return next((e for e in history if e["id"] == entry_id), None)
+
+    def _iter_global_entries(self):
+        """Yield global history entries, streaming the response when ijson is available"""
+        with self.http.get(f"{BASE_URL}/api/global-history", stream=True) as response:
+            if IJSON_AVAILABLE:
+                yield from ijson.items(response.raw, "history.item")
+            else:
+                yield from _json_of(response)["history"]
+
+    def _global_entry(self, entry_id):
+        """Global history entry with the given id, or None"""
+        return next((e for e in self._iter_global_entries() if e["id"] == entry_id), None)
+
     def test_add_history_and_verify_starred_false(self):
         """Test adding history entry has starred=False by default"""
         # Add a history entry
@@ -47,18 +147,19 @@ class TestHistoryStarAPIEndpoints:
             "operation": "test-operation"
         }
 
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
+        response = self.http.post(f"{BASE_URL}/api/history/{self.worker_tool}", json=data)
         assert response.status_code == 200
 
-        result = response.json()
-        assert result["success"] is True
+        # Fail fast on a malformed POST body before spending a GET on it
+        result = _json_of(response)
+        assert result.get("success") is True and result.get("entry_id")
         entry_id = result["entry_id"]
 
         # Get history and verify starred=False
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
+        response = self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}")
         assert response.status_code == 200
 
-        history_data = response.json()
+        history_data = _json_of(response)
         assert "history" in history_data
         assert len(history_data["history"]) == 1
 
@@ -66,202 +167,155 @@ class TestHistoryStarAPIEndpoints:
         assert entry["id"] == entry_id
         assert entry["starred"] is False
 
-    def test_star_local_history_entry(self):
+    def test_star_local_history_entry(self, add_entry):
         """Test starring a local history entry via API"""
         # Add entry
-        data = {
-            "data": "test data for starring",
-            "operation": "test-star"
-        }
-
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        assert response.status_code == 200
-        entry_id = response.json()["entry_id"]
+        entry_id = add_entry("test data for starring", "test-star")
 
         # Star the entry
-        star_data = {"starred": True}
-        response = requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
-            json=star_data
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
+            data=_STAR_TRUE
         )
         assert response.status_code == 200
 
-        result = response.json()
+        result = _json_of(response)
         assert result["success"] is True
         assert "starred" in result["message"]
 
         # Verify entry is starred in local history
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
-        entry = history_data["history"][0]
+        entry = self._local_entry(entry_id)
         assert entry["starred"] is True
 
         # Verify entry is starred in global history
-        response = requests.get(f"{BASE_URL}/api/global-history")
-        global_data = response.json()
-        global_entry = next(e for e in global_data["history"] if e["id"] == entry_id)
+        global_entry = self._global_entry(entry_id)
         assert global_entry["starred"] is True
 
-    def test_unstar_local_history_entry(self):
+    def test_unstar_local_history_entry(self, add_entry):
         """Test unstarring a local history entry via API"""
         # Add and star entry
-        data = {
-            "data": "test data for unstarring",
-            "operation": "test-unstar"
-        }
-
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        entry_id = response.json()["entry_id"]
+        entry_id = add_entry("test data for unstarring", "test-unstar")
 
         # Star it first
-        requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
-            json={"starred": True}
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
+            data=_STAR_TRUE
         )
+        assert response.status_code == 200
 
         # Unstar the entry
-        star_data = {"starred": False}
-        response = requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
-            json=star_data
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
+            data=_STAR_FALSE
         )
         assert response.status_code == 200
 
-        result = response.json()
+        result = _json_of(response)
         assert result["success"] is True
         assert "unstarred" in result["message"]
 
         # Verify entry is not starred
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
-        entry = history_data["history"][0]
+        entry = self._local_entry(entry_id)
         assert entry["starred"] is False
 
-    def test_star_global_history_entry(self):
+    def test_star_global_history_entry(self, add_entry):
         """Test starring a global history entry via API"""
         # Add entry
-        data = {
-            "data": "test data for global starring",
-            "operation": "test-global-star"
-        }
-
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        entry_id = response.json()["entry_id"]
+        entry_id = add_entry("test data for global starring", "test-global-star")
 
         # Star via global endpoint
-        star_data = {"starred": True}
-        response = requests.put(
+        response = self.http.put(
             f"{BASE_URL}/api/global-history/{entry_id}/star",
-            json=star_data
+            data=_STAR_TRUE
         )
         assert response.status_code == 200
 
-        result = response.json()
+        result = _json_of(response)
         assert result["success"] is True
 
         # Verify entry is starred in both local and global
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
-        entry = history_data["history"][0]
+        entry = self._local_entry(entry_id)
         assert entry["starred"] is True
 
-        response = requests.get(f"{BASE_URL}/api/global-history")
-        global_data = response.json()
-        global_entry = next(e for e in global_data["history"] if e["id"] == entry_id)
+        global_entry = self._global_entry(entry_id)
         assert global_entry["starred"] is True
 
     def test_star_nonexistent_local_entry(self):
         """Test starring nonexistent local entry returns 404"""
-        star_data = {"starred": True}
-        response = requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/fake-entry-id/star",
-            json=star_data
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/fake-entry-id/star",
+            data=_STAR_TRUE
         )
         assert response.status_code == 404
 
-        result = response.json()
+        result = _json_of(response)
         assert "error" in result
         assert "not found" in result["error"].lower()
 
     def test_star_nonexistent_global_entry(self):
         """Test starring nonexistent global entry returns 404"""
-        star_data = {"starred": True}
-        response = requests.put(
+        response = self.http.put(
             f"{BASE_URL}/api/global-history/fake-entry-id/star",
-            json=star_data
+            data=_STAR_TRUE
         )
         assert response.status_code == 404
 
-        result = response.json()
+        result = _json_of(response)
         assert "error" in result
         assert "not found" in result["error"].lower()
 
     def test_star_with_invalid_data(self):
         """Test starring with invalid request data"""
-        # Add entry first
-        data = {
-            "data": "test data",
-            "operation": "test"
-        }
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        entry_id = response.json()["entry_id"]
+        # The request body is validated before the entry lookup, so no real
+        # entry (and no extra POST round trip) is needed to reach these errors
+        entry_id = "fake-entry-id"
 
         # Test missing starred field
-        response = requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
             json={"invalid": "data"}
         )
         assert response.status_code == 400
 
-        result = response.json()
+        result = _json_of(response)
         assert "error" in result
         assert "starred" in result["error"]
 
         # Test no JSON data - this returns 500 because Flask can't parse None as JSON
-        response = requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star"
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star"
         )
         assert response.status_code in [400, 500]  # Either is acceptable for this error case
 
     def test_star_with_invalid_tool_name(self):
         """Test starring with invalid tool name"""
-        star_data = {"starred": True}
-        response = requests.put(
+        response = self.http.put(
             f"{BASE_URL}/api/history/invalid@tool/fake-id/star",
-            json=star_data
+            data=_STAR_TRUE
         )
         assert response.status_code == 400
 
-        result = response.json()
+        result = _json_of(response)
         assert "error" in result
         assert "Invalid tool name" in result["error"]
 
     def test_multiple_entries_star_management_via_api(self):
         """Test managing stars for multiple entries via API"""
-        entry_ids = []
-
-        # Add multiple entries
-        for i in range(3):
-            data = {
-                "data": f"test data {i}",
-                "operation": f"test-op-{i}"
-            }
-            response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-            entry_ids.append(response.json()["entry_id"])
-
-        # Star first and third entries
-        requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_ids[0]}/star",
-            json={"starred": True}
-        )
-        requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_ids[2]}/star",
-            json={"starred": True}
-        )
+        # Add multiple entries, starring the first and third, in one round trip
+        payload = {
+            "entries": [
+                {"data": f"test data {i}", "operation": f"test-op-{i}", "starred": i != 1}
+                for i in range(3)
+            ]
+        }
+        response = self.http.post(f"{BASE_URL}/api/history/{self.worker_tool}/bulk", json=payload)
+        assert response.status_code == 200
+        entry_ids = _json_of(response)["entry_ids"]
+        assert len(entry_ids) == 3
 
         # Verify correct starred status in local history
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
+        response = self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}")
+        history_data = _json_of(response)
         entries = history_data["history"]
 
         assert len(entries) == 3
@@ -272,92 +326,98 @@ class TestHistoryStarAPIEndpoints:
         starred_status = [entry["starred"] for entry in entries]
         assert starred_status == [True, True, False]  # [entry2, entry0, entry1]
 
-        # Verify in global history
-        response = requests.get(f"{BASE_URL}/api/global-history")
-        global_data = response.json()
-
-        # Find our test tool entries (from this specific test)
-        test_entries = [e for e in global_data["history"] if e["tool_name"] == TEST_TOOL]
-
-        # Get the most recent 3 entries for this tool (our test entries)
-        recent_test_entries = test_entries[:3]
-        assert len(recent_test_entries) == 3
+        # Verify in global history, stopping once this test's entries are found;
+        # other workers may share the global history
+        test_entries = list(islice(
+            (e for e in self._iter_global_entries() if e["id"] in entry_ids), 3
+        ))
+        assert len(test_entries) == 3
 
         # Check starred status for our recent entries
-        starred_global = [e["starred"] for e in recent_test_entries]
+        starred_global = [e["starred"] for e in test_entries]
         assert starred_global == [True, True, False]  # Same pattern
 
-    def test_star_synchronization_between_local_and_global(self):
+    def test_star_synchronization_between_local_and_global(self, add_entry):
         """Test that starring in local syncs to global and vice versa"""
         # Add entry
-        data = {
-            "data": "sync test data",
-            "operation": "sync-test"
-        }
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        entry_id = response.json()["entry_id"]
+        entry_id = add_entry("sync test data", "sync-test")
 
         # Star via local endpoint
-        requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
-            json={"starred": True}
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
+            data=_STAR_TRUE
         )
+        assert response.status_code == 200
 
         # Check global history is updated
-        response = requests.get(f"{BASE_URL}/api/global-history")
-        global_data = response.json()
-        global_entry = next(e for e in global_data["history"] if e["id"] == entry_id)
+        global_entry = self._global_entry(entry_id)
         assert global_entry["starred"] is True
 
         # Unstar via global endpoint
-        requests.put(
+        response = self.http.put(
             f"{BASE_URL}/api/global-history/{entry_id}/star",
-            json={"starred": False}
+            data=_STAR_FALSE
         )
+        assert response.status_code == 200
 
         # Check local history is updated
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
-        local_entry = history_data["history"][0]
+        local_entry = self._local_entry(entry_id)
         assert local_entry["starred"] is False
 
-    def test_star_persists_through_server_operations(self):
+    def test_star_persists_through_server_operations(self, add_entry):
         """Test that starred status persists through various operations"""
-        # Add and star entry
-        data = {
-            "data": "persistence test data",
-            "operation": "persistence-test"
-        }
-        response = requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json=data)
-        entry_id = response.json()["entry_id"]
-
-        requests.put(
-            f"{BASE_URL}/api/history/{TEST_TOOL}/{entry_id}/star",
-            json={"starred": True}
+        # Add and star entry via the star endpoint
+        entry_id = add_entry("persistence test data", "persistence-test")
+        response = self.http.put(
+            f"{BASE_URL}/api/history/{self.worker_tool}/{entry_id}/star",
+            data=_STAR_TRUE
         )
+        assert response.status_code == 200
 
-        # Add more entries
-        for i in range(2):
-            requests.post(f"{BASE_URL}/api/history/{TEST_TOOL}", json={
-                "data": f"additional data {i}",
-                "operation": f"additional-{i}"
-            })
+        # Add more entries on top of the starred one
+        payload = {
+            "entries": [
+                {"data": f"additional data {i}", "operation": f"additional-{i}"}
+                for i in range(2)
+            ]
+        }
+        response = self.http.post(f"{BASE_URL}/api/history/{self.worker_tool}/bulk", json=payload)
+        assert response.status_code == 200
 
-        # Original starred entry should still be starred
-        response = requests.get(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        history_data = response.json()
+        # Original starred entry should still be starred and listed first
+        response = self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}")
+        history_data = _json_of(response)
         entries = history_data["history"]
 
+        assert len(entries) == 3
+        assert entries[0]["id"] == entry_id
         starred_entries = [e for e in entries if e["starred"]]
         assert len(starred_entries) == 1
         assert starred_entries[0]["id"] == entry_id
 
-    def teardown_method(self):
-        """Cleanup after each test"""
-        try:
-            requests.delete(f"{BASE_URL}/api/history/{TEST_TOOL}")
-        except:
-            pass
+    def test_bulk_add_with_invalid_entries(self):
+        """Test bulk add rejects malformed batches without adding anything"""
+        response = self.http.post(f"{BASE_URL}/api/history/{self.worker_tool}/bulk", json={"entries": []})
+        assert response.status_code == 400
+        assert "entries" in _json_of(response)["error"]
+
+        response = self.http.post(
+            f"{BASE_URL}/api/history/{self.worker_tool}/bulk",
+            json={"entries": [{"data": "ok"}, {"operation": "missing-data"}]}
+        )
+        assert response.status_code == 400
+        assert "data" in _json_of(response)["error"]
+
+        # A string "false" must not be read as a truthy starred flag
+        response = self.http.post(
+            f"{BASE_URL}/api/history/{self.worker_tool}/bulk",
+            json={"entries": [{"data": "ok", "starred": "false"}]}
+        )
+        assert response.status_code == 400
+        assert "starred" in _json_of(response)["error"]
+
+        response = self.http.get(f"{BASE_URL}/api/history/{self.worker_tool}")
+        assert _json_of(response)["history"] == []
 
 
 if __name__ == "__main__":
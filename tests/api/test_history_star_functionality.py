@@ -4,366 +4,299 @@ Comprehensive tests for history star functionality
 Tests the new star feature implementation including API endpoints and synchronization
 """
 
-import sys
-import os
+import re
 import pytest
-import json
-from unittest.mock import patch, MagicMock
-
-# Add src to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+from types import SimpleNamespace
 
 from api.history import HistoryManager, validate_tool_name, sanitize_data
 
+# sanitize_data payloads, built once at import
+_LARGE_OVERSHOOT = "x" * (1024 * 1024 + 1)  # 1MB + 1 byte
+_SMALL_PAYLOAD = "x" * 100
+_DATA_TOO_LARGE_RE = re.compile("Data too large")
+
+
+def _partition_starred(entries):
+    """Split a history snapshot into (starred, non_starred) in a single pass"""
+    starred, non_starred = [], []
+    for entry in entries:
+        (starred if entry["starred"] else non_starred).append(entry)
+    return starred, non_starred
+
+
+def _entry_args(method_name, tool, entry_id):
+    """Positional entry arguments for a local (tool, id) or global (id) HistoryManager method"""
+    return (entry_id,) if "global" in method_name else (tool, entry_id)
+
+
+@pytest.fixture(scope="class")
+def _shared_manager():
+    """HistoryManager built once per class; __init__ stats and parses config.json"""
+    return HistoryManager(use_fast_ids=True)
+
+
+@pytest.fixture
+def ctx(_shared_manager):
+    """Reset HistoryManager plus the default tool/data/operation for each test"""
+    _shared_manager.reset()
+    return SimpleNamespace(
+        manager=_shared_manager,
+        tool="test-tool",
+        data="sample test data for history",
+        operation="test-operation"
+    )
+
 
 class TestHistoryStarFunctionality:
     """Test suite for history star functionality"""
 
-    def setup_method(self):
-        """Setup fresh HistoryManager for each test"""
-        self.history_manager = HistoryManager()
-        self.test_tool = "test-tool"
-        self.test_data = "sample test data for history"
-        self.test_operation = "test-operation"
-
-    def test_add_history_entry_with_default_starred_false(self):
+    def test_add_history_entry_with_default_starred_false(self, ctx):
         """Test that new history entries have starred=False by default"""
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
+        result = ctx.manager.add_history_entry(
+            ctx.tool, ctx.data, ctx.operation
         )
 
         assert result["success"] is True
         assert "entry_id" in result
 
         # Check local history
-        local_history = self.history_manager.get_history(self.test_tool)
+        local_history = ctx.manager.get_history(ctx.tool)
         assert len(local_history) == 1
         assert local_history[0]["starred"] is False
 
         # Check global history
-        global_history = self.history_manager.get_global_history()
+        global_history = ctx.manager.get_global_history()
         assert len(global_history) == 1
         assert global_history[0]["starred"] is False
 
-    def test_update_star_status_local_history(self):
-        """Test starring/unstarring local history entries"""
+    @pytest.mark.parametrize("star_fn_name", ["update_star_status", "update_global_star_status"])
+    def test_star_toggle_syncs_local_and_global(self, ctx, star_fn_name):
+        """Test starring/unstarring via either method updates both histories and entry lookups"""
         # Add entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
+        result = ctx.manager.add_history_entry(
+            ctx.tool, ctx.data, ctx.operation
         )
         entry_id = result["entry_id"]
 
+        star_fn = getattr(ctx.manager, star_fn_name)
+        star_args = _entry_args(star_fn_name, ctx.tool, entry_id)
+
         # Star the entry
-        success = self.history_manager.update_star_status(self.test_tool, entry_id, True)
-        assert success is True
+        assert star_fn(*star_args, True) is True
 
-        # Verify starred in local history
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert local_history[0]["starred"] is True
+        # Specific entry retrieval includes star status on both sides
+        entry = ctx.manager.get_history_entry(ctx.tool, entry_id)
+        assert entry["id"] == entry_id
+        assert entry["data"] == ctx.data
+        assert entry["starred"] is True
 
-        # Verify starred in global history (should sync)
-        global_history = self.history_manager.get_global_history()
-        assert global_history[0]["starred"] is True
+        global_entry = ctx.manager.get_global_history_entry(entry_id)
+        assert global_entry["id"] == entry_id
+        assert global_entry["data"] == ctx.data
+        assert global_entry["tool_name"] == ctx.tool
+        assert global_entry["starred"] is True
 
         # Unstar the entry
-        success = self.history_manager.update_star_status(self.test_tool, entry_id, False)
-        assert success is True
+        assert star_fn(*star_args, False) is True
 
         # Verify unstarred in both
-        local_history = self.history_manager.get_history(self.test_tool)
+        local_history = ctx.manager.get_history(ctx.tool)
         assert local_history[0]["starred"] is False
 
-        global_history = self.history_manager.get_global_history()
+        global_history = ctx.manager.get_global_history()
         assert global_history[0]["starred"] is False
 
-    def test_update_global_star_status(self):
-        """Test starring/unstarring global history entries"""
-        # Add entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
-        )
-        entry_id = result["entry_id"]
+    def test_star_bulk_counts_only_existing_entries(self, ctx):
+        """Test bulk starring skips unknown ids and reports how many were updated"""
+        entry_id = ctx.manager.add_history_entry(ctx.tool, ctx.data, ctx.operation)["entry_id"]
 
-        # Star via global method
-        success = self.history_manager.update_global_star_status(entry_id, True)
-        assert success is True
+        assert ctx.manager.update_star_status_bulk(ctx.tool, [entry_id, "fake-id"], True) == 1
+        assert ctx.manager.get_global_history_entry(entry_id)["starred"] is True
+        assert ctx.manager.update_star_status_bulk("nonexistent-tool", [entry_id], False) == 0
 
-        # Verify starred in both local and global
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert local_history[0]["starred"] is True
-
-        global_history = self.history_manager.get_global_history()
-        assert global_history[0]["starred"] is True
-
-        # Unstar via global method
-        success = self.history_manager.update_global_star_status(entry_id, False)
-        assert success is True
-
-        # Verify unstarred in both
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert local_history[0]["starred"] is False
-
-        global_history = self.history_manager.get_global_history()
-        assert global_history[0]["starred"] is False
-
-    def test_star_nonexistent_entry(self):
+    def test_star_nonexistent_entry(self, ctx):
         """Test starring nonexistent entries returns False"""
-        success = self.history_manager.update_star_status(self.test_tool, "fake-id", True)
+        success = ctx.manager.update_star_status(ctx.tool, "fake-id", True)
         assert success is False
 
-        success = self.history_manager.update_global_star_status("fake-id", True)
+        success = ctx.manager.update_global_star_status("fake-id", True)
         assert success is False
 
-    def test_star_nonexistent_tool(self):
+    def test_star_nonexistent_tool(self, ctx):
         """Test starring entries for nonexistent tools returns False"""
-        success = self.history_manager.update_star_status("fake-tool", "fake-id", True)
+        success = ctx.manager.update_star_status("fake-tool", "fake-id", True)
         assert success is False
 
-    def test_multiple_entries_star_management(self):
+    def test_multiple_entries_star_management(self, ctx):
         """Test managing stars across multiple entries"""
         # Add multiple entries
-        entries = []
-        for i in range(3):
-            result = self.history_manager.add_history_entry(
-                self.test_tool, f"data-{i}", f"op-{i}"
-            )
-            entries.append(result["entry_id"])
+        entries = ctx.manager.add_history_entries(ctx.tool, [(f"data-{i}", f"op-{i}") for i in range(3)])
 
         # Star first and third entries (entries[0] is oldest, entries[2] is newest)
-        self.history_manager.update_star_status(self.test_tool, entries[0], True)
-        self.history_manager.update_star_status(self.test_tool, entries[2], True)
+        assert ctx.manager.update_star_status_bulk(ctx.tool, [entries[0], entries[2]], True) == 2
 
         # Verify correct starred status
-        local_history = self.history_manager.get_history(self.test_tool)
+        local_history = ctx.manager.get_history(ctx.tool)
         assert len(local_history) == 3
 
         # Note: starred items come first, then non-starred (both groups in insertion order)
         # Starred: entries[0], entries[2] -> but entries[2] was starred last so it's first in starred group
         # Actually the starred items maintain their original order within the starred group
-        starred_entries = [e for e in local_history if e["starred"]]
-        non_starred_entries = [e for e in local_history if not e["starred"]]
+        starred_entries, non_starred_entries = _partition_starred(local_history)
 
         assert len(starred_entries) == 2
         assert len(non_starred_entries) == 1
         assert non_starred_entries[0]["operation"] == "op-1"  # entries[1] is not starred
 
         # Verify in global history - same pattern
-        global_history = self.history_manager.get_global_history()
+        global_history = ctx.manager.get_global_history()
         assert len(global_history) == 3
-        starred_global = [e for e in global_history if e["starred"]]
-        non_starred_global = [e for e in global_history if not e["starred"]]
+        starred_global, non_starred_global = _partition_starred(global_history)
         assert len(starred_global) == 2
         assert len(non_starred_global) == 1
 
-    def test_cross_tool_star_independence(self):
+    def test_cross_tool_star_independence(self, ctx):
         """Test that stars are independent across different tools"""
         tool1 = "tool-1"
         tool2 = "tool-2"
 
         # Add entries to both tools
-        result1 = self.history_manager.add_history_entry(tool1, "data1", "op1")
-        result2 = self.history_manager.add_history_entry(tool2, "data2", "op2")
+        result1 = ctx.manager.add_history_entry(tool1, "data1", "op1")
+        result2 = ctx.manager.add_history_entry(tool2, "data2", "op2")
 
         entry1_id = result1["entry_id"]
         entry2_id = result2["entry_id"]
 
         # Star only tool1 entry
-        self.history_manager.update_star_status(tool1, entry1_id, True)
+        ctx.manager.update_star_status(tool1, entry1_id, True)
 
         # Verify tool1 entry is starred
-        tool1_history = self.history_manager.get_history(tool1)
+        tool1_history = ctx.manager.get_history(tool1)
         assert tool1_history[0]["starred"] is True
 
         # Verify tool2 entry is not starred
-        tool2_history = self.history_manager.get_history(tool2)
+        tool2_history = ctx.manager.get_history(tool2)
         assert tool2_history[0]["starred"] is False
 
         # Verify global history shows correct stars
-        global_history = self.history_manager.get_global_history()
+        global_history = ctx.manager.get_global_history()
         assert len(global_history) == 2
 
         # Starred items come first, so tool1 entry (starred) is first
-        starred_global = [e for e in global_history if e["starred"]]
-        non_starred_global = [e for e in global_history if not e["starred"]]
+        starred_global, non_starred_global = _partition_starred(global_history)
 
         assert len(starred_global) == 1
         assert len(non_starred_global) == 1
         assert starred_global[0]["tool_name"] == tool1
         assert non_starred_global[0]["tool_name"] == tool2
 
-    def test_star_persistence_through_operations(self):
+    def test_star_persistence_through_operations(self, ctx):
         """Test that star status persists through other operations"""
         # Add entry and star it
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
+        result = ctx.manager.add_history_entry(
+            ctx.tool, ctx.data, ctx.operation
         )
         entry_id = result["entry_id"]
 
-        self.history_manager.update_star_status(self.test_tool, entry_id, True)
+        ctx.manager.update_star_status(ctx.tool, entry_id, True)
 
         # Add more entries
-        for i in range(2):
-            self.history_manager.add_history_entry(
-                self.test_tool, f"new-data-{i}", f"new-op-{i}"
-            )
+        ctx.manager.add_history_entries(ctx.tool, [(f"new-data-{i}", f"new-op-{i}") for i in range(2)])
 
         # Verify original starred entry still starred
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert len(local_history) == 3
-
-        # Find the starred entry (should be the oldest one, at index 2)
-        starred_entries = [entry for entry in local_history if entry["starred"]]
-        assert len(starred_entries) == 1
-        assert starred_entries[0]["starred"] is True
-
-    def test_star_status_in_get_history_entry(self):
-        """Test that specific entry retrieval includes star status"""
-        # Add and star entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
-        )
-        entry_id = result["entry_id"]
-
-        self.history_manager.update_star_status(self.test_tool, entry_id, True)
-
-        # Get specific entry
-        entry = self.history_manager.get_history_entry(self.test_tool, entry_id)
-        assert entry is not None
-        assert entry["id"] == entry_id
-        assert entry["data"] == self.test_data
-
-    def test_star_status_in_get_global_history_entry(self):
-        """Test that specific global entry retrieval includes star status"""
-        # Add and star entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
-        )
-        entry_id = result["entry_id"]
-
-        self.history_manager.update_global_star_status(entry_id, True)
-
-        # Get specific global entry
-        entry = self.history_manager.get_global_history_entry(entry_id)
-        assert entry is not None
-        assert entry["id"] == entry_id
-        assert entry["data"] == self.test_data
-        assert entry["tool_name"] == self.test_tool
-
-    def test_delete_starred_entry_local(self):
-        """Test that starred entries cannot be deleted from local history"""
+        assert ctx.manager.count_history(ctx.tool) == 3
+
+        # Look the starred entry up directly instead of scanning the list
+        entry = ctx.manager.get_history_entry(ctx.tool, entry_id)
+        assert entry["starred"] is True
+
+    @pytest.mark.parametrize("star_method,delete_method", [
+        ("update_star_status", "delete_history_entry"),
+        ("update_global_star_status", "delete_global_history_entry"),
+    ])
+    def test_star_delete_roundtrip(self, ctx, star_method, delete_method):
+        """Test that starred entries cannot be deleted until they are unstarred"""
         # Add and star entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
+        result = ctx.manager.add_history_entry(
+            ctx.tool, ctx.data, ctx.operation
         )
         entry_id = result["entry_id"]
 
-        self.history_manager.update_star_status(self.test_tool, entry_id, True)
-
-        # Verify starred
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert local_history[0]["starred"] is True
+        star = getattr(ctx.manager, star_method)
+        delete = getattr(ctx.manager, delete_method)
+        star(*_entry_args(star_method, ctx.tool, entry_id), True)
 
         # Attempt to delete entry - should fail because it's starred
-        success = self.history_manager.delete_history_entry(self.test_tool, entry_id)
-        assert success is False  # Cannot delete starred entries
+        assert delete(*_entry_args(delete_method, ctx.tool, entry_id)) is False
 
         # Verify entry still exists
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert len(local_history) == 1
+        assert ctx.manager.count_history(ctx.tool) == 1
+        assert ctx.manager.count_global_history() == 1
 
-        global_history = self.history_manager.get_global_history()
-        assert len(global_history) == 1
+        # Once unstarred the same delete removes it from both histories
+        star(*_entry_args(star_method, ctx.tool, entry_id), False)
+        assert delete(*_entry_args(delete_method, ctx.tool, entry_id)) is True
+        assert ctx.manager.count_history(ctx.tool) == 0
+        assert ctx.manager.count_global_history() == 0
 
-    def test_delete_starred_entry_global(self):
-        """Test that starred entries cannot be deleted from global history"""
-        # Add and star entry
-        result = self.history_manager.add_history_entry(
-            self.test_tool, self.test_data, self.test_operation
-        )
-        entry_id = result["entry_id"]
-
-        self.history_manager.update_global_star_status(entry_id, True)
-
-        # Attempt to delete via global method - should fail because it's starred
-        success = self.history_manager.delete_global_history_entry(entry_id)
-        assert success is False  # Cannot delete starred entries
-
-        # Verify entry still exists
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert len(local_history) == 1
-
-        global_history = self.history_manager.get_global_history()
-        assert len(global_history) == 1
-
-    def test_clear_history_removes_starred_entries(self):
+    def test_clear_history_removes_starred_entries(self, ctx):
         """Test that clearing history removes starred entries"""
-        # Add and star multiple entries
-        for i in range(3):
-            result = self.history_manager.add_history_entry(
-                self.test_tool, f"data-{i}", f"op-{i}"
-            )
-            if i % 2 == 0:  # Star every other entry
-                self.history_manager.update_star_status(self.test_tool, result["entry_id"], True)
+        # Add and star multiple entries (every other entry is starred)
+        ctx.manager.add_history_entries(ctx.tool, [(f"data-{i}", f"op-{i}", i % 2 == 0) for i in range(3)])
 
         # Verify some entries are starred
-        local_history = self.history_manager.get_history(self.test_tool)
-        starred_count = sum(1 for entry in local_history if entry["starred"])
-        assert starred_count == 2
+        assert ctx.manager.starred_count(ctx.tool) == 2
 
         # Clear history
-        result = self.history_manager.clear_history(self.test_tool)
+        result = ctx.manager.clear_history(ctx.tool)
         assert result["success"] is True
 
         # Verify all local entries cleared
-        local_history = self.history_manager.get_history(self.test_tool)
-        assert len(local_history) == 0
+        assert ctx.manager.count_history(ctx.tool) == 0
+        assert ctx.manager.starred_count(ctx.tool) == 0
 
         # Global history should still contain entries (clear_history only clears local)
-        global_history = self.history_manager.get_global_history()
-        assert len(global_history) == 3
+        assert ctx.manager.count_global_history() == 3
+        assert ctx.manager.global_starred_count() == 2
 
-    def test_history_limit_with_starred_entries(self):
+    def test_history_limit_with_starred_entries(self, ctx):
         """Test that starred entries are preserved beyond history limit"""
         # Set a small limit for testing
-        original_limit = self.history_manager._get_history_limit(self.test_tool)
+        ctx.manager.limit_overrides[ctx.tool] = 2
 
-        with patch.object(self.history_manager, '_get_history_limit', return_value=2):
-            # Add first entry and star it
-            result0 = self.history_manager.add_history_entry(
-                self.test_tool, "data-0", "op-0"
-            )
-            self.history_manager.update_star_status(self.test_tool, result0["entry_id"], True)
+        # Add first entry and star it
+        result0 = ctx.manager.add_history_entry(
+            ctx.tool, "data-0", "op-0"
+        )
+        ctx.manager.update_star_status(ctx.tool, result0["entry_id"], True)
 
-            # Add 2 more entries (these will trigger limit)
-            for i in range(1, 3):
-                self.history_manager.add_history_entry(
-                    self.test_tool, f"data-{i}", f"op-{i}"
-                )
+        # Add 2 more entries (these will trigger limit)
+        add = ctx.manager.add_history_entry
+        for i in range(1, 3):
+            add(ctx.tool, f"data-{i}", f"op-{i}")
 
-            # Should have 3 entries: 1 starred + 2 non-starred (limit applies to non-starred only)
-            local_history = self.history_manager.get_history(self.test_tool)
-            assert len(local_history) == 3
+        # Should have 3 entries: 1 starred + 2 non-starred (limit applies to non-starred only)
+        local_history = ctx.manager.get_history(ctx.tool)
+        assert len(local_history) == 3
 
-            # Starred entry should be preserved
-            starred_entries = [entry for entry in local_history if entry["starred"]]
-            assert len(starred_entries) == 1
-            assert starred_entries[0]["operation"] == "op-0"
+        # Starred entry should be preserved; starred entries sort first, so it is the only one
+        starred = next(entry for entry in local_history if entry["starred"])
+        assert starred["operation"] == "op-0"
+        assert local_history[1]["starred"] is False
 
 
 class TestValidationUtilityFunctions:
     """Test utility functions used by history functionality"""
 
-    def test_validate_tool_name_valid(self):
+    @pytest.mark.parametrize("name", ["json-tool", "yaml_tool", "tool123", "a", "regex-tester"])
+    def test_validate_tool_name_valid(self, name):
         """Test valid tool name validation"""
-        valid_names = ["json-tool", "yaml_tool", "tool123", "a", "regex-tester"]
-        for name in valid_names:
-            assert validate_tool_name(name) is True
+        assert validate_tool_name(name) is True
 
-    def test_validate_tool_name_invalid(self):
+    @pytest.mark.parametrize("name", ["", None, "tool with spaces", "tool@special", "tool.dot"])
+    def test_validate_tool_name_invalid(self, name):
         """Test invalid tool name validation"""
-        invalid_names = ["", None, "tool with spaces", "tool@special", "tool.dot"]
-        for name in invalid_names:
-            assert validate_tool_name(name) is False
+        assert validate_tool_name(name) is False
 
     def test_sanitize_data_normal(self):
         """Test normal data sanitization"""
@@ -379,22 +312,23 @@ class TestValidationUtilityFunctions:
 
     def test_sanitize_data_too_large(self):
         """Test sanitization of oversized data"""
-        large_data = "x" * (1024 * 1024 + 1)  # 1MB + 1 byte
-
-        with pytest.raises(ValueError, match="Data too large"):
-            sanitize_data(large_data)
+        with pytest.raises(ValueError, match=_DATA_TOO_LARGE_RE):
+            sanitize_data(_LARGE_OVERSHOOT)
 
     def test_sanitize_data_custom_limit(self):
         """Test sanitization with custom size limit"""
-        test_data = "x" * 100
-
         # Should pass with larger limit
-        result = sanitize_data(test_data, max_size=200)
-        assert result == test_data
+        result = sanitize_data(_SMALL_PAYLOAD, max_size=200)
+        assert result == _SMALL_PAYLOAD
 
         # Should fail with smaller limit
-        with pytest.raises(ValueError, match="Data too large"):
-            sanitize_data(test_data, max_size=50)
+        with pytest.raises(ValueError, match=_DATA_TOO_LARGE_RE):
+            sanitize_data(_SMALL_PAYLOAD, max_size=50)
+
+    def test_sanitize_data_oversized_bytes(self):
+        """Test oversized binary data is rejected before conversion"""
+        with pytest.raises(ValueError, match=_DATA_TOO_LARGE_RE):
+            sanitize_data(_SMALL_PAYLOAD.encode(), max_size=50)
 
 
 if __name__ == "__main__":
@@ -3,244 +3,163 @@ Integration tests for pagination API endpoints.
 """
 
 import pytest
-import sys
 import os
-import json
 import tempfile
-import shutil
-from unittest.mock import patch, MagicMock
-
-# Add src directory to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+from concurrent.futures import ThreadPoolExecutor
 
 from main import app
 from sources.base import SourceConfig
 
+# Give this module its own source cache home (see tests/api/conftest.py)
+pytestmark = pytest.mark.usefixtures('isolated_home')
 
-class TestPaginationEndpoints:
-    """Test pagination API endpoints."""
+# Fields shared by every stored local_file source these tests install
+_LOCAL_SOURCE_TEMPLATE = {
+    'source_type': 'local_file',
+    'staticConfig': {},
+    'dynamicVariables': {},
+    'created_at': '2023-01-01T00:00:00',
+    'updated_at': '2023-01-01T00:00:00'
+}
 
-    @pytest.fixture
-    def client(self):
-        """Create test client."""
-        app.config['TESTING'] = True
-        with app.test_client() as client:
-            yield client
 
-    @pytest.fixture
-    def temp_dir(self):
-        """Create temporary directory for testing."""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        shutil.rmtree(temp_dir, ignore_errors=True)
+def _local_source(source_id, name, path):
+    """Stored-sources mapping holding a single local_file source rooted at path."""
+    return {source_id: {**_LOCAL_SOURCE_TEMPLATE, 'source_id': source_id, 'name': name, 'pathTemplate': path}}
 
-    @pytest.fixture
-    def local_source(self, temp_dir):
-        """Create a local file source for testing."""
-        # Create test files
-        for i in range(25):
-            file_path = os.path.join(temp_dir, f'file_{i:02d}.txt')
-            with open(file_path, 'w') as f:
-                f.write(f'Content {i}')
 
-        # Create test directories
-        for i in range(5):
-            dir_path = os.path.join(temp_dir, f'dir_{i:02d}')
-            os.makedirs(dir_path)
+# Entry names in pagination_tree, in ascending name order
+_EXPECTED_NAMES_ASC = sorted([f'dir_{i:02d}' for i in range(5)] + [f'file_{i:02d}.txt' for i in range(25)])
+_EXPECTED_NAMES_DESC = _EXPECTED_NAMES_ASC[::-1]
 
-        # Mock source storage
-        with patch('utils.source_helpers.get_stored_sources') as mock_get_sources:
-            mock_sources = {
-                'test-local-123': {
-                    'source_id': 'test-local-123',
-                    'name': 'Test Local',
-                    'source_type': 'local_file',
-                    'staticConfig': {},
-                    'pathTemplate': temp_dir,
-                    'dynamicVariables': {},
-                    'created_at': '2023-01-01T00:00:00',
-                    'updated_at': '2023-01-01T00:00:00'
-                }
-            }
-            mock_get_sources.return_value = mock_sources
 
-            yield 'test-local-123'
+@pytest.fixture(scope="module")
+def pagination_tree(tmp_path_factory):
+    """Build the 25-file, 5-directory tree once; no test in this module writes to it."""
+    root = tmp_path_factory.mktemp('pagination')
 
-    def test_browse_paginated_endpoint_basic(self, client, local_source):
-        """Test basic pagination endpoint functionality."""
-        response = client.get(f'/api/sources/{local_source}/browse-paginated')
+    # Create test files
+    for i in range(25):
+        (root / f'file_{i:02d}.txt').write_bytes(f'Content {i}'.encode('ascii'))
 
-        assert response.status_code == 200
-        data = json.loads(response.data)
+    # Create test directories
+    for i in range(5):
+        (root / f'dir_{i:02d}').mkdir()
 
-        assert data['success'] is True
-        assert 'items' in data
-        assert 'pagination' in data
-        assert len(data['items']) <= 50  # Default limit
-        assert data['pagination']['page'] == 1
-        assert data['pagination']['limit'] == 50
-
-    def test_browse_paginated_with_pagination_params(self, client, local_source):
-        """Test pagination endpoint with custom parameters."""
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={
-                                'page': 2,
-                                'limit': 10,
-                                'sort_by': 'name',
-                                'sort_order': 'desc'
-                            })
+    return str(root)
+
+
+class TestPaginationEndpoints:
+    """Test pagination API endpoints."""
+
+    @pytest.fixture
+    def local_source(self, pagination_tree, stored_sources):
+        """Create a local file source for testing."""
+        stored_sources(_local_source('test-local-123', 'Test Local', pagination_tree))
+        return 'test-local-123'
+
+    @pytest.fixture
+    def browse_url(self, local_source):
+        """browse-paginated endpoint URL for the local test source."""
+        return f'/api/sources/{local_source}/browse-paginated'
+
+    @pytest.mark.parametrize("query_string,expected", [
+        ({}, {'page': 1, 'limit': 50}),  # Defaults
+        ({'page': 2, 'limit': 10, 'sort_by': 'name', 'sort_order': 'desc'},
+         {'page': 2, 'limit': 10, 'sort_by': 'name', 'sort_order': 'desc'}),
+        ({'page': -1}, {'page': 1}),  # Negative page is corrected to 1
+        ({'limit': 0}, {'limit': 1}),  # Zero limit is corrected to 1
+        ({'limit': 1000}, {'limit': 500}),  # Excessive limit is capped at 500
+        ({'sort_by': 'invalid_field'}, {'sort_by': 'name'}),  # Invalid sort_by defaults to 'name'
+    ])
+    def test_browse_paginated_pagination_params(self, client, browse_url, query_string, expected):
+        """Test pagination parameters are applied, corrected and reported back."""
+        response = client.get(browse_url, query_string=query_string)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
 
-        assert data['pagination']['page'] == 2
-        assert data['pagination']['limit'] == 10
-        assert data['pagination']['sort_by'] == 'name'
-        assert data['pagination']['sort_order'] == 'desc'
-        assert len(data['items']) <= 10
+        assert data['success'] is True
+        for key, value in expected.items():
+            assert data['pagination'][key] == value
+        assert len(data['items']) <= data['pagination']['limit']
 
-    def test_browse_paginated_with_path(self, client, local_source):
+    def test_browse_paginated_with_path(self, client, browse_url):
         """Test pagination endpoint with path parameter."""
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'path': 'dir_00'})
+        response = client.get(browse_url, query_string={'path': 'dir_00'})
 
         if response.status_code != 200:
             print(f"Response status: {response.status_code}")
             print(f"Response data: {response.get_data(as_text=True)}")
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
 
         assert data['success'] is True
         assert 'path' in data  # Remove specific path assertion since it might be processed differently
 
-    def test_browse_paginated_cache_invalidation(self, client, local_source):
+    def test_browse_paginated_cache_invalidation(self, client, browse_url):
         """Test cache invalidation with refresh parameter."""
         # First request (populates cache)
-        response1 = client.get(f'/api/sources/{local_source}/browse-paginated')
+        response1 = client.get(browse_url)
         assert response1.status_code == 200
 
         # Second request with refresh (should invalidate cache)
-        response2 = client.get(f'/api/sources/{local_source}/browse-paginated',
-                             query_string={'refresh': 'true'})
+        response2 = client.get(browse_url, query_string={'refresh': 'true'})
         assert response2.status_code == 200
 
         # Both should return same data structure
-        data1 = json.loads(response1.data)
-        data2 = json.loads(response2.data)
+        data1 = response1.get_json()
+        data2 = response2.get_json()
         assert data1['success'] == data2['success']
 
-    def test_browse_paginated_parameter_validation(self, client, local_source):
-        """Test parameter validation."""
-        # Test negative page
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'page': -1})
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['pagination']['page'] == 1  # Should be corrected to 1
-
-        # Test zero limit
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'limit': 0})
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['pagination']['limit'] == 1  # Should be corrected to 1
-
-        # Test excessive limit
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'limit': 1000})
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['pagination']['limit'] == 500  # Should be capped at 500
-
-    def test_browse_paginated_invalid_sort_by(self, client, local_source):
-        """Test invalid sort_by parameter defaults to 'name'."""
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'sort_by': 'invalid_field'})
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['pagination']['sort_by'] == 'name'  # Should default to 'name'
-
-    def test_browse_paginated_filter_type(self, client, local_source):
+    @pytest.mark.parametrize("filter_type,is_directory", [
+        ('files', False),
+        ('directories', True),
+    ])
+    def test_browse_paginated_filter_type(self, client, browse_url, filter_type, is_directory):
         """Test filter_type parameter."""
-        # Test files filter
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'filter_type': 'files'})
-        assert response.status_code == 200
-        data = json.loads(response.data)
-
-        # All items should be files
-        for item in data['items']:
-            assert item['is_directory'] is False
-
-        # Test directories filter
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={'filter_type': 'directories'})
+        response = client.get(browse_url, query_string={'filter_type': filter_type})
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
 
-        # All items should be directories
+        # All items should match the requested type
+        assert data['items']
         for item in data['items']:
-            assert item['is_directory'] is True
+            assert item['is_directory'] is is_directory
 
     def test_browse_paginated_nonexistent_source(self, client):
         """Test pagination endpoint with nonexistent source."""
         response = client.get('/api/sources/nonexistent/browse-paginated')
         assert response.status_code == 404
 
-    def test_browse_paginated_source_error(self, client):
+    def test_browse_paginated_source_error(self, client, stored_sources):
         """Test pagination endpoint when source has errors."""
-        with patch('utils.source_helpers.get_stored_sources') as mock_get_sources:
-            mock_sources = {
-                'error-source': {
-                    'source_id': 'error-source',
-                    'name': 'Error Source',
-                    'source_type': 'local_file',
-                    'staticConfig': {},
-                    'pathTemplate': '/nonexistent/path',
-                    'dynamicVariables': {},
-                    'created_at': '2023-01-01T00:00:00',
-                    'updated_at': '2023-01-01T00:00:00'
-                }
-            }
-            mock_get_sources.return_value = mock_sources
+        stored_sources(_local_source('error-source', 'Error Source', '/nonexistent/path'))
 
-            response = client.get('/api/sources/error-source/browse-paginated')
-            assert response.status_code == 500
+        response = client.get('/api/sources/error-source/browse-paginated')
+        assert response.status_code == 500
 
-    def test_browse_paginated_sorting_functionality(self, client, local_source):
+    @pytest.mark.parametrize("sort_order", ['asc', 'desc'])
+    def test_browse_paginated_sorting_functionality(self, client, browse_url, sort_order):
         """Test sorting functionality in pagination."""
-        # Test name sorting ascending
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
+        response = client.get(browse_url,
                             query_string={
                                 'sort_by': 'name',
-                                'sort_order': 'asc',
+                                'sort_order': sort_order,
                                 'limit': 10
                             })
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
 
-        names = [item['name'] for item in data['items']]
-        assert names == sorted(names)
+        expected = _EXPECTED_NAMES_ASC if sort_order == 'asc' else _EXPECTED_NAMES_DESC
+        assert [item['name'] for item in data['items']] == expected[:10]
 
-        # Test name sorting descending
-        response = client.get(f'/api/sources/{local_source}/browse-paginated',
-                            query_string={
-                                'sort_by': 'name',
-                                'sort_order': 'desc',
-                                'limit': 10
-                            })
-        assert response.status_code == 200
-        data = json.loads(response.data)
-
-        names = [item['name'] for item in data['items']]
-        assert names == sorted(names, reverse=True)
-
-    def test_browse_paginated_response_format(self, client, local_source):
+    def test_browse_paginated_response_format(self, client, browse_url):
         """Test that response format is correct."""
-        response = client.get(f'/api/sources/{local_source}/browse-paginated')
+        response = client.get(browse_url)
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
 
         # Check required top-level fields
         required_fields = ['success', 'items', 'pagination', 'source_id', 'source_type']
@@ -260,115 +179,84 @@ class TestPaginationEndpoints:
             for field in item_fields:
                 assert field in item
 
-    def test_browse_paginated_cache_behavior(self, client, local_source):
+    @pytest.mark.slow
+    def test_browse_paginated_cache_behavior(self, client, browse_url, isolated_home):
         """Test caching behavior of pagination endpoint."""
         # First request
-        response1 = client.get(f'/api/sources/{local_source}/browse-paginated')
+        response1 = client.get(browse_url)
         assert response1.status_code == 200
 
         # Second request (should use cache)
-        response2 = client.get(f'/api/sources/{local_source}/browse-paginated')
+        response2 = client.get(browse_url)
         assert response2.status_code == 200
 
-        # Results should be identical (from cache)
-        data1 = json.loads(response1.data)
-        data2 = json.loads(response2.data)
-        assert data1['items'] == data2['items']
+        # Results should be byte-identical (from cache). The listing carries
+        # last_modified values, so this only holds with a cache no other
+        # worker can overwrite, which isolated_home provides
+        assert response1.get_json()['success'] is True
+        assert response1.data == response2.data
 
         # Request with refresh should bypass cache
-        response3 = client.get(f'/api/sources/{local_source}/browse-paginated',
-                             query_string={'refresh': 'true'})
+        response3 = client.get(browse_url, query_string={'refresh': 'true'})
         assert response3.status_code == 200
 
-    def test_browse_paginated_s3_integration(self, client):
+    @pytest.mark.slow
+    def test_browse_paginated_s3_integration(self, client, stored_sources, s3_mock_client):
         """Test pagination endpoint with S3 source."""
-        # Mock S3 client directly
-        mock_client = MagicMock()
-        mock_paginator = MagicMock()
-        mock_client.get_paginator.return_value = mock_paginator
-
-        # Mock paginator response
-        mock_page = {
-            'Contents': [
-                {
-                    'Key': 'file1.txt',
-                    'Size': 100,
-                    'LastModified': '2023-01-01T00:00:00Z',
-                    'ETag': '"abc123"',
-                    'StorageClass': 'STANDARD'
-                }
-            ],
-            'CommonPrefixes': [{'Prefix': 'folder1/'}]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
+        s3_mock_client(
+            contents=[{
+                'Key': 'file1.txt',
+                'Size': 100,
+                'LastModified': '2023-01-01T00:00:00Z',
+                'ETag': '"abc123"',
+                'StorageClass': 'STANDARD'
+            }],
+            prefixes=['folder1/']
+        )
 
         # Mock source storage
-        with patch('utils.source_helpers.get_stored_sources') as mock_get_sources:
-            mock_sources = {
-                'test-s3': {
-                    'source_id': 'test-s3',
-                    'name': 'Test S3',
-                    'source_type': 's3',
-                    'staticConfig': {
-                        'bucket': 'test-bucket',
-                        'key': '',
-                        'region': 'us-east-1',
-                        'aws_profile': 'default'
-                    },
-                    'pathTemplate': 's3://test-bucket/',
-                    'dynamicVariables': {},
-                    'created_at': '2023-01-01T00:00:00',
-                    'updated_at': '2023-01-01T00:00:00'
-                }
+        stored_sources({
+            'test-s3': {
+                'source_id': 'test-s3',
+                'name': 'Test S3',
+                'source_type': 's3',
+                'staticConfig': {
+                    'bucket': 'test-bucket',
+                    'key': '',
+                    'region': 'us-east-1',
+                    'aws_profile': 'default'
+                },
+                'pathTemplate': 's3://test-bucket/',
+                'dynamicVariables': {},
+                'created_at': '2023-01-01T00:00:00',
+                'updated_at': '2023-01-01T00:00:00'
             }
-            mock_get_sources.return_value = mock_sources
+        })
 
-            # Patch the S3Source to use our mock client
-            with patch('sources.s3.S3Source._get_s3_client') as mock_get_client:
-                mock_get_client.return_value = mock_client
-
-                response = client.get('/api/sources/test-s3/browse-paginated')
-                assert response.status_code == 200
-                data = json.loads(response.data)
-                assert data['success'] is True
-                assert len(data['items']) == 2  # 1 file + 1 folder
+        response = client.get('/api/sources/test-s3/browse-paginated')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['success'] is True
+        assert len(data['items']) == 2  # 1 file + 1 folder
 
 
 class TestPaginationEndpointEdgeCases:
     """Test edge cases for pagination endpoints."""
 
-    @pytest.fixture
-    def client(self):
-        """Create test client."""
-        app.config['TESTING'] = True
-        with app.test_client() as client:
-            yield client
-
-    def test_empty_directory_pagination(self, client):
+    @pytest.mark.slow
+    def test_empty_directory_pagination(self, client, stored_sources):
         """Test pagination with empty directory."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            with patch('utils.source_helpers.get_stored_sources') as mock_get_sources:
-                mock_sources = {
-                    'empty-source': {
-                        'source_id': 'empty-source',
-                        'name': 'Empty Source',
-                        'source_type': 'local_file',
-                        'staticConfig': {},
-                        'pathTemplate': temp_dir,
-                        'dynamicVariables': {},
-                        'created_at': '2023-01-01T00:00:00',
-                        'updated_at': '2023-01-01T00:00:00'
-                    }
-                }
-                mock_get_sources.return_value = mock_sources
-
-                response = client.get('/api/sources/empty-source/browse-paginated')
-                assert response.status_code == 200
-                data = json.loads(response.data)
-                assert data['items'] == []
-                assert data['pagination']['total_count'] == 0
-
-    def test_pagination_beyond_available_pages(self, client):
+            stored_sources(_local_source('empty-source', 'Empty Source', temp_dir))
+
+            response = client.get('/api/sources/empty-source/browse-paginated')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data['items'] == []
+            assert data['pagination']['total_count'] == 0
+
+    @pytest.mark.slow
+    def test_pagination_beyond_available_pages(self, client, stored_sources):
         """Test requesting page beyond available data."""
         with tempfile.TemporaryDirectory() as temp_dir:
             # Create only 2 files
@@ -376,35 +264,30 @@ class TestPaginationEndpointEdgeCases:
                 with open(os.path.join(temp_dir, f'file{i}.txt'), 'w') as f:
                     f.write('content')
 
-            with patch('utils.source_helpers.get_stored_sources') as mock_get_sources:
-                mock_sources = {
-                    'small-source': {
-                        'source_id': 'small-source',
-                        'name': 'Small Source',
-                        'source_type': 'local_file',
-                        'staticConfig': {},
-                        'pathTemplate': temp_dir,
-                        'dynamicVariables': {},
-                        'created_at': '2023-01-01T00:00:00',
-                        'updated_at': '2023-01-01T00:00:00'
-                    }
-                }
-                mock_get_sources.return_value = mock_sources
-
-                # Request page 5 with limit 10 (should be empty)
-                response = client.get('/api/sources/small-source/browse-paginated',
-                                    query_string={'page': 5, 'limit': 10})
-                assert response.status_code == 200
-                data = json.loads(response.data)
-                assert data['items'] == []
-                assert data['pagination']['page'] == 5
-                assert data['pagination']['has_next'] is False
-
-    def test_concurrent_cache_access(self, client):
+            stored_sources(_local_source('small-source', 'Small Source', temp_dir))
+
+            # Request page 5 with limit 10 (should be empty)
+            response = client.get('/api/sources/small-source/browse-paginated',
+                                query_string={'page': 5, 'limit': 10})
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data['items'] == []
+            assert data['pagination']['page'] == 5
+            assert data['pagination']['has_next'] is False
+
+    @pytest.mark.slow
+    def test_concurrent_cache_access(self, pagination_tree, stored_sources):
         """Test concurrent access to cache doesn't cause issues."""
-        # This would test thread safety in a real scenario
-        # For now, it's a placeholder for more complex testing
-        pass
+        stored_sources(_local_source('concurrent-source', 'Concurrent Source', pagination_tree))
+        url = '/api/sources/concurrent-source/browse-paginated'
+
+        # The shared client keeps its request context alive, so each thread gets its own
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            responses = list(executor.map(lambda _: app.test_client().get(url), range(64)))
+
+        assert all(response.status_code == 200 for response in responses)
+        # Every request sees the same page, whether it filled the cache or read from it
+        assert len({response.get_data() for response in responses}) == 1
 
 
 if __name__ == '__main__':
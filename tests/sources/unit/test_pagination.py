@@ -302,16 +302,22 @@ class TestLocalFileSourcePagination:
         pagination = PaginationOptions(page=1, limit=20, filter_type='files')
         result = self.source.list_contents_paginated(pagination=pagination)
 
+        assert result.total_count == 15
         for item in result.items:
             assert item['is_directory'] is False
 
-        # Filter for directories only
+        # Filter for directories only; served from the cache the files call filled
         pagination = PaginationOptions(page=1, limit=20, filter_type='directories')
         result = self.source.list_contents_paginated(pagination=pagination)
 
+        assert result.total_count == 5
         for item in result.items:
             assert item['is_directory'] is True
 
+        # The cached listing is the full directory, not the first filtered view
+        result = self.source.list_contents_paginated(pagination=PaginationOptions(page=1, limit=20))
+        assert result.total_count == 20
+
     def test_list_contents_paginated_subdirectory(self):
         """Test pagination in subdirectory."""
         # List contents of first directory
@@ -7,6 +7,7 @@ Tests the HTML/JavaScript functionality using Selenium
 import os
 import time
 import json
+import pytest
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -16,8 +17,18 @@ from selenium.webdriver.chrome.options import Options
 import unittest
 
 
+@pytest.fixture(scope="module", autouse=True)
+def shared_webdriver(webdriver_url):
+    """Point the test classes at the session-wide chromedriver before setUpClass"""
+    if webdriver_url:
+        TextDiffFrontendTest.webdriver_url = webdriver_url
+
+
 class TextDiffFrontendTest(unittest.TestCase):
     """Frontend integration tests for the Text Diff Tool"""
+
+    # Persistent chromedriver/Grid endpoint; only the browser session is per class
+    webdriver_url = os.environ.get('HELPFUL_TOOLS_WEBDRIVER_URL')
     
     @classmethod
     def setUpClass(cls):
@@ -27,25 +38,33 @@ class TextDiffFrontendTest(unittest.TestCase):
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--incognito")
         
-        try:
-            cls.driver = webdriver.Chrome(options=chrome_options)
-        except Exception as e:
-            # Fallback to Firefox if Chrome not available
-            cls.driver = webdriver.Firefox()
+        if cls.webdriver_url:
+            cls.driver = webdriver.Remote(command_executor=cls.webdriver_url, options=chrome_options)
+        else:
+            try:
+                cls.driver = webdriver.Chrome(options=chrome_options)
+            except Exception as e:
+                # Fallback to Firefox if Chrome not available
+                cls.driver = webdriver.Firefox()
         
         cls.base_url = os.environ.get('HELPFUL_TOOLS_BASE_URL', "http://localhost:8000")
         cls.wait = WebDriverWait(cls.driver, 10)
     
     @classmethod
     def tearDownClass(cls):
-        """Clean up driver"""
+        """Clean up driver (ends the browser session, chromedriver keeps running)"""
         cls.driver.quit()
     
     def setUp(self):
         """Navigate to text diff tool before each test"""
         self.driver.get(f"{self.base_url}/tools/text-diff")
         self.wait.until(EC.presence_of_element_located((By.ID, "text1")))
+
+    def tearDown(self):
+        """Clear browser storage so the shared session stays isolated between tests"""
+        self.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
     
     def test_page_loads_correctly(self):
         """Test that the text diff page loads with all elements"""